@@ -1,6 +1,6 @@
 {
     'name': 'Recrutement ONGs',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'category': 'Human Resources',
     'summary': 'Module de recrutement pour ONGs avec candidature en ligne',
     'description': """
@@ -22,7 +22,9 @@ Module complet pour le recrutement d'ONGs permettant:
         'views/ong_evaluation_criteria_views.xml',
         'data/activity_domains_data.xml',
         'data/cron_data.xml',
+        'data/mail_template_data.xml',
         'wizards/ong_export_wizard_views.xml',
+        'wizards/ong_application_import_wizard_views.xml',
         'reports/ong_dashboard_reports.xml',
         'views/dashboard_views.xml',
         'views/website_templates.xml',
@@ -4,13 +4,24 @@ from odoo import http, fields, _
 from odoo.http import request
 from datetime import datetime, date
 from odoo.exceptions import ValidationError
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
 from odoo.tools import html_sanitize
-import base64
+from odoo.tools.safe_eval import datetime as safe_datetime
+from ..tools.admission import check_admission
+from ..tools.fragment_cache import campaign_fragments
+from werkzeug.http import http_date
+import hashlib
 import logging
+import psycopg2
 import re
+from urllib.parse import urlencode
 
 _logger = logging.getLogger(__name__)
 
+def _is_concurrency_error(error):
+    """Conflit de concurrence PostgreSQL que Odoo rejoue automatiquement (avec délai borné)"""
+    return isinstance(error, psycopg2.OperationalError) and error.pgcode in PG_CONCURRENCY_ERRORS_TO_RETRY
+
 class OngRecruitmentController(http.Controller):
 
     @http.route(['/ong-recruitment', '/ong-recruitment/campaigns'], type='http', auth="public", website=True)
@@ -31,26 +42,27 @@ class OngRecruitmentController(http.Controller):
             if state_filter:
                 domain.append(('state', '=', state_filter))
                 
+            # Récupérer une page de campagnes (par pertinence en cas de recherche)
+            Campaign = request.env['ong.recruitment.campaign'].sudo()
+            limit = self._get_page_limit(kw.get('limit'))
+            cursor = kw.get('cursor')
+            campaigns, next_cursor = Campaign._search_page(domain, limit, cursor=cursor, term=search_query)
             if search_query:
-                domain.extend([
-                    '|', '|',
-                    ('name', 'ilike', search_query),
-                    ('description_text', 'ilike', search_query),
-                    ('description', 'ilike', search_query)
-                ])
-            
-            # Récupérer les campagnes
-            campaigns = request.env['ong.recruitment.campaign'].sudo().search(
-                domain, 
-                order='state desc, end_date asc'
-            )
+                total_count = Campaign._fulltext_search_count(search_query, domain)
+            else:
+                total_count = Campaign.search_count(domain)
             
-            # Calculer les statistiques pour chaque campagne
+            # Liens de pagination conservant les filtres
+            list_params = {key: value for key, value in (
+                ('search', search_query), ('state', state_filter), ('limit', kw.get('limit')),
+            ) if value}
+            next_url = f"/ong-recruitment/campaigns?{urlencode(dict(list_params, cursor=next_cursor))}" if next_cursor else None
+            first_url = f"/ong-recruitment/campaigns?{urlencode(list_params)}" if cursor else None
+            
+            # Les statistiques sont calculées en une requête groupée pour toute la liste
             campaign_data = []
+            card_html = {}
             for campaign in campaigns:
-                # S'assurer que les champs calculés sont à jour
-                campaign._compute_statistics()
-                
                 # Calculer les jours restants
                 days_remaining = None
                 if campaign.state == 'open' and campaign.end_date:
@@ -61,13 +73,20 @@ class OngRecruitmentController(http.Controller):
                     'campaign': campaign,
                     'days_remaining': days_remaining,
                     'is_urgent': days_remaining is not None and days_remaining <= 7,
-                    'description_preview': self._get_description_preview(campaign, 150),
                 }
                 campaign_data.append(campaign_info)
+                
+                # Carte rendue une seule fois par version de la campagne
+                card_html[campaign.id] = self._render_campaign_fragment(
+                    'recrutement_ongs.campaign_card', campaign, days_remaining)
             
             values = {
                 'campaigns': campaigns,
                 'campaign_data': campaign_data,
+                'card_html': card_html,
+                'total_count': total_count,
+                'next_url': next_url,
+                'first_url': first_url,
                 'search_query': search_query,
                 'state_filter': state_filter,
                 'page_name': 'campaigns',
@@ -82,6 +101,43 @@ class OngRecruitmentController(http.Controller):
             _logger.error(f"Erreur lors de l'affichage des campagnes: {str(e)}")
             return request.render('website.404')
 
+    # Taille de page par défaut et maximale des listes de campagnes
+    PAGE_DEFAULT_LIMIT = 12
+    PAGE_MAX_LIMIT = 50
+
+    def _get_page_limit(self, value):
+        """Taille de page demandée, bornée entre 1 et PAGE_MAX_LIMIT"""
+        try:
+            limit = int(value) if value else self.PAGE_DEFAULT_LIMIT
+        except (ValueError, TypeError):
+            limit = self.PAGE_DEFAULT_LIMIT
+        return min(max(limit, 1), self.PAGE_MAX_LIMIT)
+
+    def _render_campaign_fragment(self, template, campaign, *version):
+        """Fragment QWeb d'une campagne, servi depuis le cache LRU du worker
+
+        La clé porte la version de tout ce qui est affiché : date de
+        modification, langue, compteurs de candidatures, critères (liste et
+        dernière modification) et ``version`` (par exemple les jours restants). Les éditeurs du site
+        (mode édition, balisage d'édition) obtiennent toujours un rendu frais.
+        """
+        render = lambda: request.env['ir.qweb']._render(template, {
+            'campaign': campaign,
+            'datetime': safe_datetime,
+        })
+        if (request.website.is_publisher() or request.env.context.get('inherit_branding')
+                or request.env.context.get('edit_translations')):
+            return render()
+
+        key = (
+            request.env.cr.dbname, template, campaign.id, campaign.write_date,
+            request.env.lang, request.website.id,
+            campaign.total_applications, campaign.selected_applications,
+            tuple(campaign.criteria_ids.ids),
+            max(campaign.criteria_ids.mapped('write_date'), default=None), *version,
+        )
+        return campaign_fragments.get_or_render(key, render)
+
     @http.route(['/ong-recruitment/campaign/<int:campaign_id>'], type='http', auth="public", website=True)
     def campaign_detail(self, campaign_id, **kw):
         """Page de détail d'une campagne avec HTML sécurisé"""
@@ -91,9 +147,6 @@ class OngRecruitmentController(http.Controller):
             if not campaign.exists() or not campaign.website_published:
                 return request.render('website.404')
             
-            # Mettre à jour les statistiques
-            campaign._compute_statistics()
-            
             # Calculer les statistiques contextuelles
             days_remaining = None
             if campaign.end_date:
@@ -107,7 +160,7 @@ class OngRecruitmentController(http.Controller):
                 'can_apply': campaign.state == 'open' and (not days_remaining or days_remaining > 0),
                 'page_name': 'campaign_detail',
                 'page_title': f'Campagne: {campaign.name}',
-                'description_safe_html': self._get_safe_html_description(campaign),
+                'detail_body_html': self._render_campaign_fragment('recrutement_ongs.campaign_detail_body', campaign),
                 'datetime': datetime,
                 'date': date,
             }
@@ -132,6 +185,15 @@ class OngRecruitmentController(http.Controller):
                 return request.render('recrutement_ongs.campaign_expired', {'campaign': campaign})
             
             if request.httprequest.method == 'POST':
+                # Contrôle d'admission avant tout traitement coûteux
+                retry_after = check_admission(request.env, request.httprequest.remote_addr)
+                if retry_after:
+                    _logger.info(f"Soumission différée pour la campagne {campaign.id} (réessai dans {retry_after}s)")
+                    return request.render('recrutement_ongs.submission_busy', {
+                        'campaign': campaign,
+                        'retry_after': retry_after,
+                    }, status=429, headers={'Retry-After': str(retry_after)})
+                
                 # Traiter la soumission du formulaire
                 return self._process_application_enhanced(campaign, **kw)
             
@@ -143,7 +205,12 @@ class OngRecruitmentController(http.Controller):
             # Récupérer les messages de session
             form_error = request.session.pop('form_error', None)
             form_success = request.session.pop('form_success', None)
-            form_data = request.session.pop('form_data', {})
+            
+            # Reprise d'un brouillon (jeton en paramètre ou en session)
+            draft = self._get_session_draft(campaign, kw.get('draft'))
+            if draft:
+                self._remember_draft_token(campaign, draft)
+            form_data = dict(draft.data or {}) if draft else {}
             
             # Traiter les domaines d'activités pré-sélectionnés (pour pré-remplissage)
             selected_domains = []
@@ -161,56 +228,70 @@ class OngRecruitmentController(http.Controller):
                 'form_data': form_data,
                 'form_error': form_error,
                 'form_success': form_success,
+                'draft': draft,
+                'draft_documents': draft._get_document_names() if draft else {},
             }
             
             return request.render('recrutement_ongs.application_form', values)
             
         except Exception as e:
+            if _is_concurrency_error(e):
+                raise
             _logger.error(f"Erreur lors de la candidature à la campagne {campaign_id}: {str(e)}")
             return request.render('website.404')
 
     def _process_application_enhanced(self, campaign, **kw):
         """Traiter une candidature avec validation renforcée"""
+        draft = request.env['ong.application.draft'].sudo()._get_by_token(campaign, kw.get('draft_token'))
+        document_uploads = {}
         try:
-            # Valider les données avec la méthode existante
-            self._validate_post_data(kw)
-            
-            # Vérifier si l'email n'a pas déjà postulé
-            existing_application = request.env['ong.application'].sudo().search([
-                ('campaign_id', '=', campaign.id),
-                ('email', '=', kw.get('email', '').strip().lower())
-            ])
+            # Lecture des documents, plafonnée avant toute création
+            document_uploads = self._read_document_uploads(kw)
+            
+            # Validation et conversion des données en une seule passe
+            application_vals = self._validate_post_data(campaign, kw)
+            
+            # Documents transmis lors d'une tentative précédente et non remplacés
+            draft_documents = {
+                field: filename for field, filename in draft._get_document_names().items()
+                if field not in document_uploads
+            } if draft else {}
+            
+            # Noms des documents et soumission ajoutés aux valeurs validées
+            # pour créer la candidature en un seul INSERT
+            application_vals.update({
+                f'{field}_name': filename for field, (filename, _content) in document_uploads.items()
+            })
+            application_vals.update({f'{field}_name': filename for field, filename in draft_documents.items()})
+            application_vals.update({
+                'state': 'submitted',
+                'submission_date': fields.Datetime.now(),
+            })
             
-            if existing_application:
+            # Création de la candidature, déjà validée selon le schéma.
+            # Les doublons sont détectés par l'index unique (campagne, email)
+            try:
+                with request.env.cr.savepoint():
+                    application = request.env['ong.application'].sudo().create(application_vals)
+                    self._store_document_uploads(application, document_uploads)
+                    if draft_documents:
+                        draft._transfer_documents(application, list(draft_documents))
+                    
+                    # Création des évaluations pour les critères si présents
+                    self._create_criteria_evaluations(application, campaign, kw)
+            except psycopg2.errors.UniqueViolation as e:
+                if e.diag.constraint_name != request.env['ong.application']._EMAIL_UNIQUE_INDEX:
+                    raise
                 request.session['form_error'] = "Une candidature avec cet email existe déjà pour cette campagne"
-                request.session['form_data'] = kw
-                return request.redirect(f'/ong-recruitment/apply/{campaign.id}')
-            
-            # Traitement des domaines d'activité
-            activity_domains_ids = self._process_activity_domains(kw.get('activity_domains'))
+                return self._redirect_to_draft(campaign, draft, kw, document_uploads)
             
-            # Préparation des valeurs pour la création
-            application_vals = self._prepare_application_values(campaign.id, kw)
+            # Le brouillon n'a plus lieu d'être une fois la candidature soumise
+            if draft:
+                draft.unlink()
+                self._forget_draft_token(campaign)
             
-            # Création de la candidature
-            application = request.env['ong.application'].sudo().create(application_vals)
-            
-            # Gestion des domaines d'activité
-            if activity_domains_ids:
-                application.write({'activity_domains': [(6, 0, activity_domains_ids)]})
-                _logger.info(f"Domaines d'activités attachés à la candidature {application.id}: {activity_domains_ids}")
-            
-            # Gestion des fichiers uploadés
-            self._handle_file_uploads(application, kw)
-            
-            # Création des évaluations pour les critères si présents
-            self._create_criteria_evaluations(application, campaign, kw)
-            
-            # Soumission de la candidature (déclenche l'évaluation automatique)
-            if hasattr(application, 'action_submit'):
-                application.action_submit()
-            else:
-                application.write({'state': 'submitted'})
+            # Évaluation et notification différées
+            application._enqueue_post_submission_jobs()
             
             _logger.info(f"Nouvelle candidature créée: {application.name} (ID: {application.id})")
             
@@ -222,18 +303,76 @@ class OngRecruitmentController(http.Controller):
         except ValidationError as e:
             _logger.warning(f"Erreur de validation lors de la soumission: {str(e)}")
             request.session['form_error'] = str(e)
-            request.session['form_data'] = kw
-            return request.redirect(f'/ong-recruitment/apply/{campaign.id}')
+            return self._redirect_to_draft(campaign, draft, kw, document_uploads)
         except ValueError as e:
             _logger.warning(f"Erreur de données lors de la soumission: {str(e)}")
             request.session['form_error'] = f"Erreur dans les données saisies: {str(e)}"
-            request.session['form_data'] = kw
-            return request.redirect(f'/ong-recruitment/apply/{campaign.id}')
+            return self._redirect_to_draft(campaign, draft, kw, document_uploads)
         except Exception as e:
+            # Relayé pour que la requête entière soit rejouée, fichiers rembobinés
+            if _is_concurrency_error(e):
+                raise
             _logger.error(f"Erreur inattendue lors de la soumission: {str(e)}")
             request.session['form_error'] = "Une erreur inattendue s'est produite. Veuillez réessayer."
-            request.session['form_data'] = kw
-            return request.redirect(f'/ong-recruitment/apply/{campaign.id}')
+            return self._redirect_to_draft(campaign, draft, kw, document_uploads)
+
+    def _redirect_to_draft(self, campaign, draft, post, document_uploads):
+        """Conserver la saisie et les documents dans le brouillon, puis revenir au formulaire
+
+        Seul le jeton du brouillon est gardé en session ; les fichiers déjà
+        transmis n'auront pas à être renvoyés.
+        """
+        try:
+            with request.env.cr.savepoint():
+                if not draft:
+                    draft = request.env['ong.application.draft'].sudo().create({'campaign_id': campaign.id})
+                draft._apply_changes(post)
+                draft._store_documents(document_uploads)
+            self._remember_draft_token(campaign, draft)
+        except Exception as e:
+            _logger.error(f"Impossible d'enregistrer le brouillon de candidature: {str(e)}")
+        return request.redirect(f'/ong-recruitment/apply/{campaign.id}')
+
+    def _get_session_draft(self, campaign, token=None):
+        """Brouillon désigné par le jeton fourni, ou à défaut par celui de la session"""
+        token = token or request.session.get('ong_draft_tokens', {}).get(str(campaign.id))
+        return request.env['ong.application.draft'].sudo()._get_by_token(campaign, token)
+
+    def _remember_draft_token(self, campaign, draft):
+        tokens = dict(request.session.get('ong_draft_tokens', {}))
+        tokens[str(campaign.id)] = draft.token
+        request.session['ong_draft_tokens'] = tokens
+
+    def _forget_draft_token(self, campaign):
+        tokens = dict(request.session.get('ong_draft_tokens', {}))
+        if tokens.pop(str(campaign.id), None):
+            request.session['ong_draft_tokens'] = tokens
+
+    @http.route(['/ong-recruitment/apply/<int:campaign_id>/autosave'], type='json', auth='public', website=True)
+    def autosave_application(self, campaign_id, token=None, changes=None, **kwargs):
+        """Sauvegarde automatique des champs modifiés du formulaire dans un brouillon"""
+        try:
+            campaign = request.env['ong.recruitment.campaign'].sudo().browse(campaign_id)
+            if not campaign.exists() or not campaign.website_published or campaign.state != 'open':
+                return {'status': 'error', 'message': 'Campagne non disponible'}
+            if not isinstance(changes, dict):
+                return {'status': 'error', 'message': 'Modifications invalides'}
+            
+            retry_after = check_admission(request.env, request.httprequest.remote_addr, scope='autosave')
+            if retry_after:
+                return {'status': 'error', 'message': 'Trop de sauvegardes, veuillez patienter', 'retry_after': retry_after}
+            
+            draft = self._get_session_draft(campaign, token)
+            if not draft:
+                draft = request.env['ong.application.draft'].sudo().create({'campaign_id': campaign.id})
+            draft._apply_changes(changes)
+            self._remember_draft_token(campaign, draft)
+            
+            return {'status': 'success', 'token': draft.token}
+        
+        except Exception as e:
+            _logger.error(f"Erreur lors de la sauvegarde du brouillon pour la campagne {campaign_id}: {str(e)}")
+            return {'status': 'error', 'message': 'Erreur lors de la sauvegarde du brouillon'}
 
     def _process_activity_domains(self, activity_domains_data):
         """Traitement des domaines d'activité avec gestion robuste de tous les formats"""
@@ -277,14 +416,10 @@ class OngRecruitmentController(http.Controller):
                 if activity_domains_data > 0:
                     domain_ids.append(activity_domains_data)
             
-            # Vérifier que les IDs existent réellement dans la base de données
+            # Ne conserver que les domaines actifs (ensemble mis en cache)
             if domain_ids:
-                existing_domains = request.env['ong.activity.domain'].sudo().search([
-                    ('id', 'in', domain_ids),
-                    ('active', '=', True)
-                ])
-                domain_ids = existing_domains.ids
-                _logger.info(f"Domaines d'activités traités: {domain_ids}")
+                active_domain_ids = request.env['ong.activity.domain'].sudo()._get_active_domain_ids()
+                domain_ids = [domain_id for domain_id in dict.fromkeys(domain_ids) if domain_id in active_domain_ids]
             
         except Exception as e:
             _logger.warning(f"Erreur lors du traitement des domaines d'activité: {activity_domains_data} - {str(e)}")
@@ -303,25 +438,31 @@ class OngRecruitmentController(http.Controller):
         return request.env['ong.activity.domain'].sudo().browse()
 
     def _create_criteria_evaluations(self, application, campaign, form_data):
-        """Créer les évaluations pour les critères de la campagne"""
-        try:
-            for criterion in campaign.criteria_ids:
-                response_key = f'criterion_{criterion.id}'
-                if response_key in form_data and form_data[response_key]:
-                    try:
-                        score = float(form_data[response_key])
-                        # Valider que le score ne dépasse pas le maximum
-                        score = min(score, criterion.max_score)
-                        request.env['ong.application.evaluation'].sudo().create({
-                            'application_id': application.id,
-                            'criteria_id': criterion.id,
-                            'score': score,
-                        })
-                        _logger.info(f"Évaluation créée pour le critère {criterion.name}: {score}/{criterion.max_score}")
-                    except (ValueError, TypeError) as e:
-                        _logger.warning(f"Score invalide pour le critère {criterion.name}: {form_data[response_key]} - {str(e)}")
-        except Exception as e:
-            _logger.warning(f"Erreur lors de la création des évaluations critères: {e}")
+        """Créer les évaluations pour les critères de la campagne
+
+        Seules les valeurs saisies invalides sont ignorées : toute autre erreur
+        remonte et annule la soumission.
+        """
+        evaluation_vals = []
+        for criterion in campaign.criteria_ids:
+            response_key = f'criterion_{criterion.id}'
+            if response_key in form_data and form_data[response_key]:
+                try:
+                    score = float(form_data[response_key])
+                except (ValueError, TypeError) as e:
+                    _logger.warning(f"Score invalide pour le critère {criterion.name}: {form_data[response_key]} - {str(e)}")
+                    continue
+                # Valider que le score ne dépasse pas le maximum
+                evaluation_vals.append({
+                    'application_id': application.id,
+                    'criterion_id': criterion.id,
+                    'score': min(score, criterion.max_score),
+                })
+        
+        if evaluation_vals:
+            # Le classement de la campagne est recalculé par la file de traitements
+            request.env['ong.application.evaluation'].sudo().with_context(skip_rank_refresh=True).create(evaluation_vals)
+            _logger.info(f"{len(evaluation_vals)} évaluations créées pour la candidature {application.id}")
 
     @http.route(['/ong-recruitment/application/<int:application_id>/success'], type='http', auth="public", website=True)
     def application_success(self, application_id, **kw):
@@ -345,7 +486,7 @@ class OngRecruitmentController(http.Controller):
             _logger.error(f"Erreur lors de l'affichage de la confirmation: {str(e)}")
             return request.render('website.404')
 
-    @http.route(['/ong-recruitment/search'], type='json', auth="public", website=True)
+    @http.route(['/ong-recruitment/search'], type='json', auth="public", website=True, methods=['POST'])
     def search_campaigns(self, term="", **kw):
         """Recherche AJAX de campagnes avec descriptions nettoyées"""
         try:
@@ -354,15 +495,11 @@ class OngRecruitmentController(http.Controller):
                 ('state', 'in', ['open', 'evaluation'])
             ]
             
+            Campaign = request.env['ong.recruitment.campaign'].sudo()
             if term:
-                domain.extend([
-                    '|', '|',
-                    ('name', 'ilike', term),
-                    ('description_text', 'ilike', term),
-                    ('description', 'ilike', term)
-                ])
-            
-            campaigns = request.env['ong.recruitment.campaign'].sudo().search(domain, limit=10)
+                campaigns = Campaign.browse(Campaign._fulltext_search_ids(term, domain, limit=10))
+            else:
+                campaigns = Campaign.search(domain, limit=10)
             
             results = []
             for campaign in campaigns:
@@ -382,7 +519,7 @@ class OngRecruitmentController(http.Controller):
             _logger.error(f"Erreur lors de la recherche: {str(e)}")
             return {'error': 'Erreur de recherche'}
 
-    @http.route(['/ong-recruitment/api/campaigns'], type='json', auth='public', website=True)
+    @http.route(['/ong-recruitment/api/campaigns'], type='json', auth='public', website=True, methods=['POST'])
     def api_campaigns(self, **kwargs):
         """API JSON pour récupérer les campagnes (pour AJAX)"""
         try:
@@ -392,16 +529,15 @@ class OngRecruitmentController(http.Controller):
             if kwargs.get('state'):
                 domain.append(('state', '=', kwargs.get('state')))
             
-            if kwargs.get('search'):
-                search_term = kwargs.get('search')
-                domain.extend([
-                    '|', '|', 
-                    ('name', 'ilike', search_term),
-                    ('description_text', 'ilike', search_term),
-                    ('description', 'ilike', search_term)
-                ])
-            
-            campaigns = request.env['ong.recruitment.campaign'].sudo().search(domain)
+            # Pagination par curseur : les clients parcourent la liste page par page
+            Campaign = request.env['ong.recruitment.campaign'].sudo()
+            search_term = kwargs.get('search')
+            limit = self._get_page_limit(kwargs.get('limit'))
+            campaigns, next_cursor = Campaign._search_page(domain, limit, cursor=kwargs.get('cursor'), term=search_term)
+            if search_term:
+                total = Campaign._fulltext_search_count(search_term, domain)
+            else:
+                total = Campaign.search_count(domain)
             
             # Formater les données pour JSON
             campaigns_data = []
@@ -421,7 +557,8 @@ class OngRecruitmentController(http.Controller):
             return {
                 'status': 'success',
                 'campaigns': campaigns_data,
-                'total': len(campaigns_data)
+                'total': total,
+                'next_cursor': next_cursor,
             }
             
         except Exception as e:
@@ -492,46 +629,33 @@ class OngRecruitmentController(http.Controller):
             return ''
 
     # Méthodes existantes conservées avec améliorations
-    def _validate_post_data(self, post):
-        """Validation des données POST avec vérification des domaines d'activités"""
-        required_fields = {
-            'organization_name': 'Nom de l\'organisation',
-            'email': 'Email',
-            'registration_number': 'Numéro d\'enregistrement',
-            'legal_status': 'Statut légal',
-            'main_activities': 'Activités principales',
-            'years_experience': 'Années d\'expérience'
-        }
-        
+    def _validate_post_data(self, campaign, post):
+        """Validation des données POST en une passe selon le schéma compilé de la campagne
+
+        Retourne les valeurs de création de la candidature.
+        """
+        schema = request.env['ong.application'].sudo()._get_form_schema(campaign.id)
         errors = []
-        for field, label in required_fields.items():
-            if not post.get(field) or str(post.get(field)).strip() == '':
-                errors.append(f"Le champ '{label}' est obligatoire")
         
-        # Validation de l'email
-        if post.get('email'):
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, post.get('email')):
-                errors.append("L'adresse email n'est pas valide")
-        
-        # Validation des champs numériques
-        numeric_fields = ['annual_budget', 'staff_count', 'volunteer_count', 'years_experience']
-        for field in numeric_fields:
-            if post.get(field) and post.get(field) != '0':
+        # Les nombres mal saisis sont signalés avant conversion
+        for field, label, value_type, _minimum, _message in schema.numeric:
+            value = post.get(field)
+            if value and str(value).strip():
                 try:
-                    value = float(post.get(field)) if field == 'annual_budget' else int(post.get(field))
-                    if value < 0:
-                        errors.append(f"Le champ '{field}' ne peut pas être négatif")
+                    value_type(value)
                 except (ValueError, TypeError):
-                    errors.append(f"Le champ '{field}' doit être un nombre valide")
+                    errors.append(f"Le champ '{label}' doit être un nombre valide")
         
-        # Validation des domaines d'activités
-        activity_domains = post.get('activity_domains')
-        if not activity_domains or len(self._process_activity_domains(activity_domains)) == 0:
-            errors.append("Au moins un domaine d'activité doit être sélectionné")
+        values = self._prepare_application_values(campaign.id, post)
+        values['website'] = schema.normalize_website(values['website'])
+        values['activity_domains'] = self._process_activity_domains(post.get('activity_domains'))
+        errors += schema.validate(values)
         
         if errors:
             raise ValidationError('\n'.join(errors))
+        
+        values['activity_domains'] = [(6, 0, values['activity_domains'])]
+        return values
 
     def _prepare_application_values(self, campaign_id, post):
         """Préparation des valeurs pour la création de la candidature"""
@@ -580,33 +704,86 @@ class OngRecruitmentController(http.Controller):
             'state': 'draft',
         }
 
-    def _handle_file_uploads(self, application, post):
-        """Gestion de l'upload des fichiers"""
-        file_fields = [
-            ('statute_document', 'statute_document'),
-            ('certificate_document', 'certificate_document'),
-            ('financial_report', 'financial_report')
-        ]
+    # Taille des blocs lus lors de la réception d'un document
+    UPLOAD_CHUNK_SIZE = 64 * 1024
+
+    def _get_max_upload_size(self):
+        """Taille maximale d'un document en octets (paramètre ong.max_file_size, en Mo)"""
+        try:
+            max_size_mb = float(request.env['ir.config_parameter'].sudo().get_param('ong.max_file_size', 5))
+        except (ValueError, TypeError):
+            max_size_mb = 5
+        return int(max_size_mb * 1024 * 1024)
+
+    def _read_document_uploads(self, post):
+        """Lecture plafonnée des documents uploadés
+
+        Chaque fichier est lu par blocs ; un fichier dont la taille annoncée ou
+        lue dépasse la limite est refusé sans être chargé en mémoire.
+        Retourne ``{champ: (nom du fichier, contenu brut)}``.
+        """
+        file_fields = ['statute_document', 'certificate_document', 'financial_report']
+        max_size = self._get_max_upload_size()
+        uploads = {}
         
-        for post_field, app_field in file_fields:
-            if post_field in post and post[post_field]:
-                try:
-                    file_data = post[post_field]
-                    if hasattr(file_data, 'read'):
-                        file_content = file_data.read()
-                        if file_content:
-                            application.write({app_field: base64.b64encode(file_content)})
-                    elif isinstance(file_data, bytes):
-                        if file_data:
-                            application.write({app_field: base64.b64encode(file_data)})
-                    elif isinstance(file_data, str) and file_data:
-                        try:
-                            base64.b64decode(file_data)
-                            application.write({app_field: file_data})
-                        except Exception:
-                            application.write({app_field: base64.b64encode(file_data.encode())})
-                except Exception as e:
-                    _logger.warning(f"Erreur lors de l'upload du fichier {post_field}: {str(e)}")
+        for field in file_fields:
+            file_data = post.get(field)
+            if not file_data or not hasattr(file_data, 'read'):
+                continue
+            
+            filename = getattr(file_data, 'filename', None) or field
+            too_large_error = (
+                f"Le fichier '{filename}' dépasse la taille maximale autorisée "
+                f"({max_size // (1024 * 1024)} Mo)"
+            )
+            
+            # Taille connue sans lecture : en-tête de la partie ou flux temporaire
+            declared_size = getattr(file_data, 'content_length', 0) or 0
+            stream = getattr(file_data, 'stream', file_data)
+            if not declared_size and hasattr(stream, 'seekable') and stream.seekable():
+                declared_size = stream.seek(0, 2)
+                stream.seek(0)
+            if declared_size > max_size:
+                raise ValidationError(too_large_error)
+            
+            # Lecture par blocs avec contrôle de la taille cumulée ; les blocs ne
+            # sont assemblés qu'une fois, sans copie intermédiaire du contenu
+            chunks = []
+            size = 0
+            while True:
+                chunk = stream.read(self.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise ValidationError(too_large_error)
+                chunks.append(chunk)
+            
+            if size:
+                uploads[field] = (filename, b''.join(chunks))
+        
+        return uploads
+
+    def _store_document_uploads(self, application, uploads):
+        """Enregistrer les documents directement en pièces jointes des champs binaires
+
+        Le contenu brut est écrit dans le filestore sans passer par un encodage
+        base64 intermédiaire ; toutes les pièces jointes sont créées en une fois.
+        """
+        if not uploads:
+            return
+        request.env['ir.attachment'].sudo().create([{
+            'name': field,
+            'res_model': application._name,
+            'res_field': field,
+            'res_id': application.id,
+            'type': 'binary',
+            'raw': content,
+        } for field, (_filename, content) in uploads.items()])
+        
+        # Les champs binaires et leurs métadonnées sont relus depuis les pièces jointes
+        application.invalidate_recordset(list(uploads))
+        application.modified(list(uploads))
 
     @http.route('/ong-recruitment/application/<int:application_id>', type='http', auth='public', website=True)
     def application_status(self, application_id, **kwargs):
@@ -621,7 +798,7 @@ class OngRecruitmentController(http.Controller):
             'page_title': f'Statut - {application.name}',
         })
 
-    @http.route(['/ong-recruitment/api/activity-domains'], type='json', auth='public', website=True)
+    @http.route(['/ong-recruitment/api/activity-domains'], type='json', auth='public', website=True, methods=['POST'])
     def api_activity_domains(self, **kwargs):
         """API pour récupérer les domaines d'activités (utile pour AJAX)"""
         try:
@@ -650,6 +827,120 @@ class OngRecruitmentController(http.Controller):
                 'message': 'Erreur lors de la récupération des domaines d\'activités'
             }
 
+    # Validation conditionnelle (ETag) des API publiques en GET : un jeton de
+    # version peu coûteux évite de recalculer une réponse inchangée
+    def _conditional_json_response(self, version, last_modified, build_payload, max_age):
+        """Réponse JSON avec ETag et Cache-Control, ou 304 si le client a déjà cette version
+
+        ``version`` couvre toutes les données de la réponse et les paramètres de
+        la requête ; ``build_payload`` n'est appelé que si la version a changé.
+        Seul If-None-Match est pris en compte : une suppression ne change pas
+        la date de dernière modification.
+        """
+        etag = hashlib.sha1(repr(version).encode()).hexdigest()
+        headers = [
+            ('ETag', f'"{etag}"'),
+            ('Cache-Control', f'public, max-age={max_age}, must-revalidate'),
+        ]
+        if last_modified:
+            headers.append(('Last-Modified', http_date(last_modified)))
+        
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response(b'', headers=headers, status=304)
+        
+        payload = build_payload()
+        if 'error' in payload or payload.get('status') == 'error':
+            # Une erreur n'est jamais mise en cache
+            return request.make_json_response(payload, headers=[('Cache-Control', 'no-store')])
+        return request.make_json_response(payload, headers=headers)
+
+    def _get_campaigns_version(self, domain, with_applications=False):
+        """Version des campagnes du domaine : date de dernière modification et nombre
+
+        Avec ``with_applications``, les candidatures de ces campagnes sont
+        incluses, leurs compteurs faisant partie de la réponse.
+        """
+        [(last_modified, count)] = request.env['ong.recruitment.campaign'].sudo()._read_group(
+            domain, aggregates=['write_date:max', '__count'])
+        version = [last_modified, count]
+        if with_applications:
+            [(applications_modified, applications_count)] = request.env['ong.application'].sudo()._read_group(
+                [('campaign_id', 'any', domain)], aggregates=['write_date:max', '__count'])
+            version += [applications_modified, applications_count]
+            last_modified = max(filter(None, [last_modified, applications_modified]), default=None)
+        return version, last_modified
+
+    @http.route(['/ong-recruitment/search'], type='http', auth='public', website=True, methods=['GET'])
+    def search_campaigns_get(self, term="", **kw):
+        """Recherche de campagnes en GET, avec validation conditionnelle"""
+        version, last_modified = self._get_campaigns_version([
+            ('website_published', '=', True),
+            ('state', 'in', ['open', 'evaluation']),
+        ])
+        return self._conditional_json_response(
+            ['search', term, version], last_modified,
+            lambda: self.search_campaigns(term=term), max_age=60)
+
+    @http.route(['/ong-recruitment/api/campaigns'], type='http', auth='public', website=True, methods=['GET'])
+    def api_campaigns_get(self, **kwargs):
+        """API des campagnes en GET, avec validation conditionnelle"""
+        domain = [('website_published', '=', True)]
+        if kwargs.get('state'):
+            domain.append(('state', '=', kwargs.get('state')))
+        version, last_modified = self._get_campaigns_version(domain, with_applications=True)
+        params = [kwargs.get(key) for key in ('state', 'search', 'limit', 'cursor')]
+        return self._conditional_json_response(
+            ['campaigns', params, version], last_modified,
+            lambda: self.api_campaigns(**kwargs), max_age=60)
+
+    @http.route(['/ong-recruitment/api/activity-domains'], type='http', auth='public', website=True, methods=['GET'])
+    def api_activity_domains_get(self, **kwargs):
+        """API des domaines d'activités en GET, avec validation conditionnelle"""
+        groups = request.env['ong.activity.domain'].sudo()._read_group(
+            [('active', 'in', (True, False))], groupby=['active'], aggregates=['write_date:max', '__count'])
+        last_modified = max((last_write for _active, last_write, _count in groups if last_write), default=None)
+        return self._conditional_json_response(
+            ['activity_domains', groups], last_modified,
+            lambda: self.api_activity_domains(), max_age=300)
+
+    # Nombre maximal de dossiers acceptés par appel de l'API d'import
+    BATCH_API_MAX_ROWS = 1000
+
+    @http.route(['/ong-recruitment/api/applications/batch'], type='json', auth='user', methods=['POST'])
+    def api_applications_batch(self, campaign_id=None, applications=None, notify=True, **kwargs):
+        """API d'import en masse de candidatures (partenaires et fédérations)"""
+        try:
+            if not request.env.user.has_group('recrutement_ongs.group_ong_manager'):
+                return {'status': 'error', 'message': 'Accès refusé'}
+            
+            campaign = request.env['ong.recruitment.campaign'].browse(int(campaign_id or 0)).exists()
+            if not campaign or campaign.state != 'open':
+                return {'status': 'error', 'message': 'Campagne introuvable ou fermée'}
+            if not isinstance(applications, list) or not all(isinstance(row, dict) for row in applications):
+                return {'status': 'error', 'message': 'Le paramètre applications doit être une liste d\'objets'}
+            if len(applications) > self.BATCH_API_MAX_ROWS:
+                return {
+                    'status': 'error',
+                    'message': f'Au plus {self.BATCH_API_MAX_ROWS} candidatures par appel',
+                }
+            
+            report = request.env['ong.application']._import_rows(campaign, applications, notify=bool(notify))
+            created = sum(1 for line in report if line['status'] == 'created')
+            
+            return {
+                'status': 'success',
+                'created': created,
+                'errors': len(report) - created,
+                'results': report,
+            }
+            
+        except (ValueError, TypeError) as e:
+            _logger.warning(f"Paramètres invalides pour l'import de candidatures: {e}")
+            return {'status': 'error', 'message': 'Paramètres invalides'}
+        except Exception as e:
+            _logger.error(f"Erreur API import de candidatures: {e}")
+            return {'status': 'error', 'message': 'Erreur lors de l\'import des candidatures'}
+
 # Classe supplémentaire pour compatibilité avec l'ancien code si nécessaire
 class WebsiteOngRecruitment(http.Controller):
     """Contrôleur de compatibilité - redirige vers les nouvelles méthodes"""
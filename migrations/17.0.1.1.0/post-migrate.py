@@ -0,0 +1,26 @@
+# migrations/17.0.1.1.0/post-migrate.py
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Échéances des campagnes déclenchées à l'heure exacte
+
+    La tâche planifiée est en noupdate : son intervalle passe ici d'un
+    passage horaire à un passage quotidien de sécurité, et les campagnes déjà
+    ouvertes reçoivent leur déclenchement à la date de fin.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+
+    cron = env.ref('recrutement_ongs.cron_check_campaign_deadlines', raise_if_not_found=False)
+    if cron:
+        cron.write({'interval_number': 1, 'interval_type': 'days'})
+
+    campaigns = env['ong.recruitment.campaign'].search([('state', '=', 'open')])
+    campaigns._schedule_deadline_check()
+    _logger.info(f"Échéances planifiées pour {len(campaigns)} campagnes ouvertes")
@@ -1,4 +1,6 @@
 from . import ong_recruitment_campaign
 from . import ong_application
+from . import ong_application_job
+from . import ong_application_draft
 from . import ong_evaluation_criteria
 from . import ong_dashboard_reports
@@ -1,18 +1,149 @@
 # models/ong_application.py
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
-import re
+from odoo.tools.safe_eval import unsafe_eval
+from collections import namedtuple
+from functools import partial
+from ..tools.admission import prune_admission_buckets
+from .ong_evaluation_criteria import DEFAULT_BRACKET_TABLES
 import logging
+import psycopg2
+import re
 
 _logger = logging.getLogger(__name__)
 
+# Fonctions disponibles dans les formules de critères
+_FORMULA_BUILTINS = {
+    'min': min, 'max': max, 'abs': abs, 'round': round, 'len': len,
+    'bool': bool, 'int': int, 'float': float,
+    'True': True, 'False': False, 'None': None,
+}
+
+
+class ApplicationSchema(namedtuple('ApplicationSchema', ['required', 'numeric', 'email_re', 'url_re', 'domain_ids'])):
+    """Schéma de validation compilé d'un formulaire de candidature
+
+    ``required`` : (champ, libellé) ; ``numeric`` : (champ, libellé, type,
+    minimum, message) ; ``domain_ids`` : domaines d'activité acceptés.
+    """
+    __slots__ = ()
+
+    @property
+    def field_names(self):
+        """Champs de la candidature lus pour la validation"""
+        names = [field for field, _label in self.required]
+        names += [field for field, *_rest in self.numeric if field not in names]
+        return names + ['email', 'website', 'activity_domains']
+
+    def normalize_website(self, url):
+        """Ajouter http:// si l'URL n'a pas de protocole"""
+        if url and not url.startswith(('http://', 'https://')):
+            return 'http://' + url
+        return url
+
+    def check_email(self, email):
+        return bool(self.email_re.match(email))
+
+    def check_website(self, url):
+        return bool(self.url_re.match(url))
+
+    def validate(self, values, active_domains=True):
+        """Liste des erreurs pour des valeurs déjà typées (champs du modèle)
+
+        Avec ``active_domains`` (soumission web, création), seuls les domaines
+        d'activité actifs comptent ; sinon tout domaine déjà enregistré suffit.
+        """
+        errors = []
+        for field, label in self.required:
+            value = values.get(field)
+            if value is None or value is False or (isinstance(value, str) and not value.strip()):
+                errors.append(f"Le champ '{label}' est obligatoire")
+        for field, _label, _type, minimum, message in self.numeric:
+            if (values.get(field) or 0) < minimum:
+                errors.append(message)
+        if values.get('email') and not self.check_email(values['email']):
+            errors.append("L'adresse email n'est pas valide")
+        if values.get('website') and not self.check_website(self.normalize_website(values['website'])):
+            errors.append("L'URL du site web n'est pas valide")
+        domain_ids = values.get('activity_domains') or ()
+        if not (self.domain_ids.intersection(domain_ids) if active_domains else domain_ids):
+            errors.append("Au moins un domaine d'activité doit être sélectionné")
+        return errors
+
+
 class OngApplication(models.Model):
     _name = 'ong.application'
     _description = 'Candidature ONG'
     _inherit = ['mail.thread', 'mail.activity.mixin', 'portal.mixin']
     _order = 'total_score desc, create_date desc'
 
+    # Ordre de classement au sein d'une campagne : score décroissant, puis
+    # antériorité de la soumission, puis identifiant pour un ordre déterministe
+    _RANKING_ORDER = "total_score DESC, submission_date ASC NULLS LAST, id ASC"
+    # États des candidatures en compétition, départagées par la sélection automatique
+    _SELECTION_STATES = ('submitted',)
+    # États classés : en compétition ou déjà départagées, le rang restant celui de la sélection
+    _RANKED_STATES = ('submitted', 'selected', 'rejected')
+    # Champs dont la modification change le classement, hors score
+    _RANKING_FIELDS = {'campaign_id', 'state', 'submission_date'}
+
+    # Index garantissant une seule candidature par email et par campagne
+    _EMAIL_UNIQUE_INDEX = 'ong_application_campaign_email_uniq'
+
+    # Champs lus en une seule passe par le moteur de scoring
+    _SCORING_FIELDS = [
+        'campaign_id', 'name', 'email', 'phone', 'website', 'street', 'city', 'country_id',
+        'registration_number', 'main_activities', 'activity_domains',
+        'annual_budget', 'funding_sources', 'staff_count', 'volunteer_count',
+        'years_experience', 'previous_projects', 'references', 'document_count',
+    ]
+    _DOCUMENT_FIELDS = ['statute_document', 'certificate_document', 'financial_report']
+
+    # Champs dont dépend chaque critère : une modification de ces champs
+    # ne recalcule que les évaluations des critères concernés
+    _CRITERION_DEPENDENCIES = {
+        'experience': {'years_experience'},
+        'budget': {'annual_budget'},
+        'staff': {'staff_count', 'volunteer_count'},
+        'documents': set(_DOCUMENT_FIELDS),
+        'completeness': {
+            'name', 'email', 'registration_number', 'main_activities', 'years_experience',
+            'phone', 'city', 'funding_sources', 'previous_projects',
+            'website', 'street', 'references', 'country_id', 'activity_domains',
+        },
+        'activity_domains': {'activity_domains'},
+    }
+    # Colonne dénormalisée recevant le score de chaque critère standard
+    _SCORE_COLUMNS = {
+        'experience': 'score_experience',
+        'budget': 'score_budget',
+        'staff': 'score_staff',
+        'documents': 'score_documents',
+        'completeness': 'score_completeness',
+        'activity_domains': 'score_activity_domains',
+    }
+    _MEASURE_DEPENDENCIES = {
+        'years_experience': {'years_experience'},
+        'annual_budget': {'annual_budget'},
+        'staff_total': {'staff_count', 'volunteer_count'},
+        'document_count': set(_DOCUMENT_FIELDS),
+        'activity_domain_count': {'activity_domains'},
+    }
+    # Champs dont la modification déclenche un re-scoring incrémental
+    _SCORING_TRIGGER_FIELDS = set().union(*_CRITERION_DEPENDENCIES.values(), *_MEASURE_DEPENDENCIES.values())
+
+    # Taille des lots de création lors des imports en masse
+    _IMPORT_BATCH_SIZE = 200
+    # Colonnes texte d'un import : colonne du fichier -> champ de la candidature
+    _IMPORT_TEXT_COLUMNS = {
+        'organization_name': 'name', 'email': 'email', 'phone': 'phone', 'website': 'website',
+        'street': 'street', 'city': 'city', 'registration_number': 'registration_number',
+        'legal_status': 'legal_status', 'main_activities': 'main_activities',
+        'funding_sources': 'funding_sources', 'previous_projects': 'previous_projects',
+        'references': 'references',
+    }
+
     # Informations générales
     name = fields.Char('Nom de l\'ONG', required=True, tracking=True)
     email = fields.Char('Email de Contact', required=True)
@@ -58,9 +189,26 @@ class OngApplication(models.Model):
     financial_report = fields.Binary('Rapport Financier')
     financial_report_name = fields.Char('Nom du fichier - Rapport Financier')
     
+    # Métadonnées des documents, lues sans charger le contenu des fichiers
+    statute_document_size = fields.Integer('Taille - Statuts', compute='_compute_document_metadata', store=True)
+    certificate_document_size = fields.Integer('Taille - Certificat', compute='_compute_document_metadata', store=True)
+    financial_report_size = fields.Integer('Taille - Rapport Financier', compute='_compute_document_metadata', store=True)
+    document_count = fields.Integer('Documents Fournis', compute='_compute_document_metadata', store=True)
+    
     # Évaluation
     evaluation_ids = fields.One2many('ong.application.evaluation', 'application_id', string='Évaluations')
     total_score = fields.Float('Score Total', compute='_compute_total_score', store=True)
+    is_evaluated = fields.Boolean('Évaluée', compute='_compute_total_score', store=True)
+    rank_in_campaign = fields.Integer('Rang', readonly=True, index=True, copy=False,
+                                      help="Rang de la candidature parmi les candidatures soumises ou départagées de sa campagne")
+    
+    # Scores par critère standard, dénormalisés pour les listes, tris et exports
+    score_experience = fields.Float('Score Expérience', compute='_compute_total_score', store=True, index=True)
+    score_budget = fields.Float('Score Budget', compute='_compute_total_score', store=True, index=True)
+    score_staff = fields.Float('Score Équipe', compute='_compute_total_score', store=True, index=True)
+    score_documents = fields.Float('Score Documents', compute='_compute_total_score', store=True, index=True)
+    score_completeness = fields.Float('Score Complétude', compute='_compute_total_score', store=True, index=True)
+    score_activity_domains = fields.Float('Score Domaines', compute='_compute_total_score', store=True, index=True)
     
     # Workflow
     campaign_id = fields.Many2one('ong.recruitment.campaign', string='Campagne', required=True)
@@ -73,53 +221,142 @@ class OngApplication(models.Model):
     ], string='État', default='draft', tracking=True)
     
     submission_date = fields.Datetime('Date de Soumission')
+    job_ids = fields.One2many('ong.application.job', 'application_id', string='Traitements')
     rejection_reason = fields.Text('Motif de Rejet')
     
+    def init(self):
+        """Index unique fonctionnel (campagne, email en minuscules)"""
+        super().init()
+        if tools.index_exists(self.env.cr, self._EMAIL_UNIQUE_INDEX):
+            return
+        self.env.cr.execute("""
+            SELECT 1 FROM ong_application
+            GROUP BY campaign_id, lower(email)
+            HAVING COUNT(*) > 1
+            LIMIT 1
+        """)
+        if self.env.cr.fetchone():
+            _logger.error(f"Index {self._EMAIL_UNIQUE_INDEX} non créé : des candidatures en double existent déjà. "
+                          f"L'unicité est vérifiée par contrainte applicative jusqu'à leur fusion")
+            return
+        tools.create_unique_index(self.env.cr, self._EMAIL_UNIQUE_INDEX, self._table, ['campaign_id', 'lower(email)'])
+
+    @api.model
+    @tools.ormcache()
+    def _has_email_unique_index(self):
+        """L'index unique (campagne, email) existe-t-il ? (absent si des doublons l'ont bloqué)"""
+        return tools.index_exists(self.env.cr, self._EMAIL_UNIQUE_INDEX)
+
+    @api.model
+    @tools.ormcache('campaign_id')
+    def _get_form_schema(self, campaign_id):
+        """Schéma de validation compilé d'une campagne, partagé par le site web et le modèle"""
+        return ApplicationSchema(
+            required=(
+                ('name', 'Nom de l\'organisation'),
+                ('email', 'Email'),
+                ('registration_number', 'Numéro d\'enregistrement'),
+                ('legal_status', 'Statut légal'),
+                ('main_activities', 'Activités principales'),
+                ('years_experience', 'Années d\'expérience'),
+            ),
+            numeric=(
+                ('annual_budget', 'Budget annuel', float, 0, "Le budget annuel ne peut pas être négatif"),
+                ('staff_count', 'Nombre d\'employés', int, 0, "Le nombre d'employés ne peut pas être négatif"),
+                ('volunteer_count', 'Nombre de bénévoles', int, 0, "Le nombre de bénévoles ne peut pas être négatif"),
+                ('years_experience', 'Années d\'expérience', int, 1, "Les années d'expérience doivent être supérieures à 0"),
+            ),
+            email_re=re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'),
+            url_re=re.compile(r'^https?:\/\/[^\s/$.?#].[^\s]*$'),
+            domain_ids=self.env['ong.activity.domain']._get_active_domain_ids(),
+        )
+
     # Contraintes et validations
     @api.constrains('email')
     def _check_email(self):
         """Validation de l'adresse email"""
         for record in self:
-            if record.email:
-                email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                if not re.match(email_pattern, record.email):
-                    raise ValidationError("L'adresse email n'est pas valide")
+            if record.email and not self._get_form_schema(record.campaign_id.id).check_email(record.email):
+                raise ValidationError("L'adresse email n'est pas valide")
     
+    @api.constrains('campaign_id', 'email')
+    def _check_unique_email(self):
+        """Une candidature par email et par campagne, lorsque l'index unique n'a pas pu être créé"""
+        if self._has_email_unique_index():
+            return
+        for record in self:
+            if record.email and self.sudo().search_count([
+                ('id', '!=', record.id),
+                ('campaign_id', '=', record.campaign_id.id),
+                ('email', '=ilike', tools.escape_psql(record.email)),
+            ], limit=1):
+                raise ValidationError("Une candidature avec cet email existe déjà pour cette campagne")
+
     @api.constrains('annual_budget', 'staff_count', 'volunteer_count', 'years_experience')
     def _check_numeric_fields(self):
-        """Validation des champs numériques"""
+        """Validation des champs numériques selon les bornes du schéma de la campagne"""
         for record in self:
-            if record.annual_budget < 0:
-                raise ValidationError("Le budget annuel ne peut pas être négatif")
-            if record.staff_count < 0:
-                raise ValidationError("Le nombre d'employés ne peut pas être négatif")
-            if record.volunteer_count < 0:
-                raise ValidationError("Le nombre de bénévoles ne peut pas être négatif")
-            if record.years_experience < 0:
-                raise ValidationError("Les années d'expérience ne peuvent pas être négatives")
+            for field, _label, _type, minimum, message in self._get_form_schema(record.campaign_id.id).numeric:
+                if (record[field] or 0) < minimum:
+                    raise ValidationError(message)
     
     @api.constrains('website')
     def _check_website(self):
         """Validation de l'URL du site web"""
         for record in self:
             if record.website:
+                schema = self._get_form_schema(record.campaign_id.id)
                 # Ajouter http:// si pas de protocole
-                if not record.website.startswith(('http://', 'https://')):
-                    record.website = 'http://' + record.website
+                website = schema.normalize_website(record.website)
+                if website != record.website:
+                    record.website = website
                 
-                # Validation basique de l'URL
-                url_pattern = r'^https?:\/\/[^\s/$.?#].[^\s]*$'
-                if not re.match(url_pattern, record.website):
+                if not schema.check_website(website):
                     raise ValidationError("L'URL du site web n'est pas valide")
 
-    @api.depends('evaluation_ids.score')
+    @api.depends('statute_document', 'certificate_document', 'financial_report')
+    def _compute_document_metadata(self):
+        """Taille et nombre des documents, lus sur les pièces jointes sans leur contenu"""
+        sizes = {}
+        application_ids = [application_id for application_id in self.ids if isinstance(application_id, int)]
+        if application_ids:
+            attachments = self.env['ir.attachment'].sudo().search_read([
+                ('res_model', '=', self._name),
+                ('res_field', 'in', self._DOCUMENT_FIELDS),
+                ('res_id', 'in', application_ids),
+            ], ['res_id', 'res_field', 'file_size'])
+            for attachment in attachments:
+                sizes[(attachment['res_id'], attachment['res_field'])] = attachment['file_size']
+
+        for application in self:
+            document_count = 0
+            for field in self._DOCUMENT_FIELDS:
+                if isinstance(application.id, int):
+                    size = sizes.get((application.id, field), 0)
+                else:
+                    # Enregistrement non sauvegardé : contenu encore en cache (base64)
+                    size = len(application[field] or b'') * 3 // 4
+                application[f'{field}_size'] = size
+                if size:
+                    document_count += 1
+            application.document_count = document_count
+
+    @api.depends('evaluation_ids.score', 'evaluation_ids.criterion_id.code')
     def _compute_total_score(self):
-        """Calcul du score total"""
+        """Calcul du score total et des colonnes de score par critère"""
         for application in self:
-            if application.evaluation_ids:
-                application.total_score = sum(application.evaluation_ids.mapped('score'))
-            else:
-                application.total_score = 0.0
+            scores = dict.fromkeys(self._SCORE_COLUMNS.values(), 0.0)
+            total_score = 0.0
+            for evaluation in application.evaluation_ids:
+                total_score += evaluation.score
+                column = self._SCORE_COLUMNS.get(evaluation.criterion_id.code)
+                if column:
+                    scores[column] += evaluation.score
+            application.update(dict(
+                scores,
+                total_score=total_score,
+                is_evaluated=bool(application.evaluation_ids),
+            ))
 
     def action_submit(self):
         """Soumettre la candidature"""
@@ -140,81 +377,405 @@ class OngApplication(models.Model):
                 'submission_date': fields.Datetime.now()
             })
             
-            # Évaluation automatique
-            record._auto_evaluate()
-            
-            # Notification
-            record._send_submission_notification()
-            
             _logger.info(f"Candidature soumise: {record.name} (ID: {record.id})")
+        
+        self._enqueue_post_submission_jobs()
+
+    def _enqueue_post_submission_jobs(self, notify=True):
+        """Mettre en file l'évaluation automatique et la notification, traitées par le cron"""
+        return self.env['ong.application.job']._enqueue(self, ['evaluate', 'notify'] if notify else ['evaluate'])
+
+    @api.model
+    def _import_rows(self, campaign, rows, notify=True):
+        """Import en masse de candidatures soumises
+
+        ``rows`` est un itérable de dictionnaires aux clés du formulaire public,
+        consommé au fil de l'eau et créé par lots. Les candidatures créées
+        passent par la file de traitements (évaluation groupée puis
+        notification, sauf si ``notify`` est faux). Retourne un rapport par ligne :
+        ``{'row': n, 'status': 'created' | 'error', 'id' | 'message': ...}``.
+        """
+        schema = self._get_form_schema(campaign.id)
+        lookups = self._get_import_lookups()
+        report = []
+        batch = []
+
+        for row_number, row in enumerate(rows, start=1):
+            batch.append((row_number, row))
+            if len(batch) >= self._IMPORT_BATCH_SIZE:
+                report += self._import_batch(campaign, schema, lookups, batch, notify)
+                batch = []
+        if batch:
+            report += self._import_batch(campaign, schema, lookups, batch, notify)
+
+        created = sum(1 for line in report if line['status'] == 'created')
+        _logger.info(f"Import de candidatures pour la campagne {campaign.name}: "
+                     f"{created} créées, {len(report) - created} en erreur")
+        return report
+
+    @api.model
+    def _get_import_lookups(self):
+        """Tables de correspondance lues une fois par import (pays et domaines d'activité)"""
+        countries = self.env['res.country'].sudo().search_read([], ['code'])
+        domains = self.env['ong.activity.domain'].sudo().search_read([('active', '=', True)], ['name'])
+        return {
+            'country_ids': {country['id'] for country in countries},
+            'country_codes': {(country['code'] or '').upper(): country['id'] for country in countries},
+            'domain_names': {domain['name'].strip().lower(): domain['id'] for domain in domains},
+        }
+
+    @api.model
+    def _convert_import_row(self, campaign, schema, lookups, row):
+        """Conversion d'une ligne d'import en valeurs de candidature, avec ses erreurs"""
+        errors = []
+        values = {'campaign_id': campaign.id}
+        for column, field in self._IMPORT_TEXT_COLUMNS.items():
+            value = row.get(column)
+            if isinstance(value, float) and value.is_integer():
+                # Cellule numérique d'un classeur : 12345.0 -> '12345'
+                value = int(value)
+            values[field] = str(value).strip() if value not in (None, False) else ''
+        values['email'] = values['email'].lower()
+        values['website'] = schema.normalize_website(values['website'])
+        if values['legal_status'] not in dict(self._fields['legal_status'].selection):
+            errors.append(f"Statut légal inconnu : {values['legal_status']}" if values['legal_status']
+                          else "Le champ 'Statut légal' est obligatoire")
+
+        for field, label, value_type, _minimum, _message in schema.numeric:
+            value = row.get(field)
+            try:
+                # Nombres lus en flottant ('5.0', 5.0) puis convertis s'ils sont entiers
+                number = float(value) if value not in (None, False, '') else 0.0
+                if value_type is int and not number.is_integer():
+                    raise ValueError(value)
+                values[field] = value_type(number)
+            except (ValueError, TypeError):
+                values[field] = value_type(0)
+                errors.append(f"Le champ '{label}' doit être un nombre valide")
+
+        country = str(row.get('country_id') or row.get('country') or '').strip()
+        values['country_id'] = False
+        if country:
+            country_id = self._import_integer(country)
+            if country_id in lookups['country_ids']:
+                values['country_id'] = country_id
+            elif country.upper() in lookups['country_codes']:
+                values['country_id'] = lookups['country_codes'][country.upper()]
+            else:
+                errors.append(f"Pays inconnu : {country}")
+
+        # Domaines d'activité : identifiants ou noms séparés par des virgules
+        domains = row.get('activity_domains') or ''
+        if not isinstance(domains, (list, tuple)):
+            domains = str(domains).split(',')
+        domain_ids = []
+        for domain in domains:
+            domain_id = self._import_integer(domain)
+            domain = str(domain).strip()
+            if domain_id is not None:
+                domain_ids.append(domain_id)
+            elif domain.lower() in lookups['domain_names']:
+                domain_ids.append(lookups['domain_names'][domain.lower()])
+            elif domain:
+                errors.append(f"Domaine d'activité inconnu : {domain}")
+        values['activity_domains'] = [domain_id for domain_id in dict.fromkeys(domain_ids)
+                                      if domain_id in schema.domain_ids]
+
+        errors += [error for error in schema.validate(values) if error not in errors]
+        values['activity_domains'] = [(6, 0, values['activity_domains'])]
+        return values, errors
+
+    @api.model
+    def _import_integer(self, value):
+        """Entier représenté par une valeur d'import (3, 3.0, '3' ou '3.0'), sinon None"""
+        try:
+            number = float(value)
+        except (ValueError, TypeError):
+            return None
+        return int(number) if number.is_integer() else None
+
+    @api.model
+    def _import_batch(self, campaign, schema, lookups, batch, notify=True):
+        """Valider et créer un lot de lignes d'import"""
+        report = {}
+        converted = []
+        for row_number, row in batch:
+            values, errors = self._convert_import_row(campaign, schema, lookups, row)
+            if errors:
+                report[row_number] = {'row': row_number, 'status': 'error', 'message': '\n'.join(errors)}
+            else:
+                converted.append((row_number, values))
+
+        # Doublons : une seule recherche sur l'index (campagne, email en minuscules)
+        # pour le lot, puis au sein du lot (emails déjà normalisés en minuscules)
+        emails = tuple(values['email'] for _row_number, values in converted)
+        existing = set()
+        if emails:
+            self.flush_model(['campaign_id', 'email'])
+            self.env.cr.execute("""
+                SELECT lower(email) FROM ong_application
+                 WHERE campaign_id = %s AND lower(email) IN %s
+            """, [campaign.id, emails])
+            existing = {email for email, in self.env.cr.fetchall()}
+        to_create = []
+        for row_number, values in converted:
+            if values['email'] in existing:
+                report[row_number] = {
+                    'row': row_number, 'status': 'error',
+                    'message': "Une candidature avec cet email existe déjà pour cette campagne",
+                }
+                continue
+            existing.add(values['email'])
+            values.update({'state': 'submitted', 'submission_date': fields.Datetime.now()})
+            to_create.append((row_number, values))
+
+        created = self._create_import_batch(to_create, report)
+        if created:
+            created._enqueue_post_submission_jobs(notify=notify)
+        return [report[row_number] for row_number, _row in batch]
+
+    @api.model
+    def _create_import_batch(self, to_create, report):
+        """Créer un lot en une fois ; en cas d'échec, ligne par ligne pour isoler les erreurs"""
+        if not to_create:
+            return self.browse()
+        try:
+            with self.env.cr.savepoint():
+                records = self.sudo().create([values for _row_number, values in to_create])
+            for (row_number, _values), record in zip(to_create, records):
+                report[row_number] = {'row': row_number, 'status': 'created', 'id': record.id}
+            return records
+        except Exception as e:
+            _logger.warning(f"Échec de la création groupée, reprise ligne par ligne: {str(e)}")
+
+        records = self.browse()
+        for row_number, values in to_create:
+            try:
+                with self.env.cr.savepoint():
+                    record = self.sudo().create(values)
+                records |= record
+                report[row_number] = {'row': row_number, 'status': 'created', 'id': record.id}
+            except (psycopg2.IntegrityError, ValidationError) as e:
+                report[row_number] = {'row': row_number, 'status': 'error', 'message': self._import_error_message(e)}
+        return records
+
+    @api.model
+    def _import_error_message(self, error):
+        """Message lisible d'une ligne d'import refusée par la base ou par une contrainte"""
+        if isinstance(error, ValidationError):
+            return error.args[0]
+        if isinstance(error, psycopg2.errors.UniqueViolation) and error.diag.constraint_name == self._EMAIL_UNIQUE_INDEX:
+            return "Une candidature avec cet email existe déjà pour cette campagne"
+        if isinstance(error, psycopg2.errors.NotNullViolation):
+            field = self._fields.get(error.diag.column_name)
+            return f"Le champ '{field.string if field else error.diag.column_name}' est obligatoire"
+        _logger.warning(f"Ligne d'import refusée par la base de données: {str(error)}")
+        return "Les données de cette ligne sont invalides"
 
     def _validate_application(self):
-        """Validation complète de la candidature"""
+        """Validation complète de la candidature selon le schéma de sa campagne"""
         for record in self:
-            errors = []
-            
-            # Vérification des champs obligatoires
-            required_fields = {
-                'name': 'Nom de l\'organisation',
-                'email': 'Email',
-                'registration_number': 'Numéro d\'enregistrement',
-                'legal_status': 'Statut légal',
-                'main_activities': 'Activités principales',
-                'years_experience': 'Années d\'expérience'
-            }
-            
-            for field, label in required_fields.items():
-                value = getattr(record, field)
-                if not value or (isinstance(value, str) and value.strip() == ''):
-                    errors.append(f"Le champ '{label}' est obligatoire")
-            
-            # Vérification que l'expérience est positive
-            if record.years_experience <= 0:
-                errors.append("Les années d'expérience doivent être supérieures à 0")
-            
-            # Vérification qu'au moins un domaine d'activité est sélectionné
-            if not record.activity_domains:
-                errors.append("Au moins un domaine d'activité doit être sélectionné")
-            
+            schema = self._get_form_schema(record.campaign_id.id)
+            # Des domaines archivés depuis la création restent acceptés
+            errors = schema.validate(record.read(schema.field_names, load=False)[0], active_domains=False)
             if errors:
                 raise ValidationError('\n'.join(errors))
 
+    # Pas de recalcul du rang à la création : une candidature n'a pas encore de
+    # score, son rang est fixé par la tâche d'évaluation, qui le recalcule par lot
+    def write(self, vals):
+        ranked_campaigns = self.campaign_id if self._RANKING_FIELDS & set(vals) else None
+        res = super().write(vals)
+        if 'campaign_id' in vals:
+            # Les critères changent avec la campagne : réévaluation complète
+            self.filtered('evaluation_ids')._auto_evaluate()
+        else:
+            scoring_fields = set(vals) & self._SCORING_TRIGGER_FIELDS
+            if scoring_fields:
+                self.filtered('evaluation_ids')._rescore_fields(scoring_fields)
+        if ranked_campaigns is not None:
+            self._refresh_ranks_in_campaigns(ranked_campaigns | self.campaign_id)
+        return res
+
+    def unlink(self):
+        campaigns = self.campaign_id
+        res = super().unlink()
+        self._refresh_ranks_in_campaigns(campaigns)
+        return res
+
+    def _read_scoring_values(self):
+        """Lecture groupée des champs utilisés par le scoring
+
+        Les documents sont représentés par ``document_count`` : le contenu des
+        fichiers n'est jamais chargé pour calculer un score.
+        """
+        rows = self.read(self._SCORING_FIELDS, load=False)
+        return {row['id']: row for row in rows}
+
     def _auto_evaluate(self):
-        """Évaluation automatique selon les critères de la campagne"""
+        """Évaluation automatique selon les critères de la campagne
+
+        Traitement par lot : une lecture groupée des champs de toutes les
+        candidatures, un seul DELETE des évaluations existantes puis un seul
+        INSERT multi-lignes des nouvelles évaluations.
+        """
+        if not self:
+            return
+
+        values_by_id = self._read_scoring_values()
+        scorers = self._get_criterion_scorers()
+        criteria_by_campaign = {}
+        evaluation_vals = []
         for record in self:
-            # Supprimer les évaluations existantes
-            record.evaluation_ids.unlink()
-            
-            # Créer les nouvelles évaluations
-            evaluation_vals = []
-            for criterion in record.campaign_id.criteria_ids:
-                score = record._calculate_criterion_score(criterion)
+            values = values_by_id[record.id]
+            campaign_id = values['campaign_id']
+            if campaign_id not in criteria_by_campaign:
+                criteria_by_campaign[campaign_id] = record.campaign_id._get_criteria_snapshot()
+
+            for criterion in criteria_by_campaign[campaign_id]:
                 evaluation_vals.append({
                     'application_id': record.id,
                     'criterion_id': criterion.id,
-                    'score': score,
+                    'score': record._calculate_criterion_score(criterion, values, scorers),
                 })
-            
-            if evaluation_vals:
-                self.env['ong.application.evaluation'].create(evaluation_vals)
 
-    def _calculate_criterion_score(self, criterion):
-        """Calcul du score pour un critère donné"""
+        # Supprimer les évaluations existantes
+        self.evaluation_ids.with_context(skip_rank_refresh=True).unlink()
+
+        # Créer les nouvelles évaluations
+        if evaluation_vals:
+            self.env['ong.application.evaluation'].with_context(skip_rank_refresh=True).create(evaluation_vals)
+
+        self._refresh_campaign_ranks()
+
+    def _rescore_fields(self, field_names):
+        """Re-scoring incrémental après modification de ``field_names``
+
+        Seules les évaluations des critères dépendant des champs modifiés sont
+        recalculées, et mises à jour sur place lorsque le score change.
+        """
+        if not self:
+            return
+
+        values_by_id = self._read_scoring_values()
+        scorers = self._get_criterion_scorers()
+        criteria_by_campaign = {}
+        evaluations_by_score = {}
+        for evaluation in self.evaluation_ids:
+            application = evaluation.application_id
+            campaign = application.campaign_id
+            if campaign.id not in criteria_by_campaign:
+                criteria_by_campaign[campaign.id] = {
+                    criterion.id: criterion for criterion in campaign._get_criteria_snapshot()
+                }
+            criterion = criteria_by_campaign[campaign.id].get(evaluation.criterion_id.id)
+            if not criterion or not field_names & self._get_criterion_dependencies(criterion):
+                continue
+            score = application._calculate_criterion_score(criterion, values_by_id[application.id], scorers)
+            if score != evaluation.score:
+                evaluations_by_score.setdefault(score, []).append(evaluation.id)
+
+        # Une seule écriture par valeur de score
+        Evaluation = self.env['ong.application.evaluation'].with_context(skip_rank_refresh=True)
+        for score, evaluation_ids in evaluations_by_score.items():
+            Evaluation.browse(evaluation_ids).write({'score': score})
+
+        if evaluations_by_score:
+            self._refresh_campaign_ranks()
+
+    def _refresh_campaign_ranks(self):
+        """Recalcul groupé du rang des candidatures dans leurs campagnes"""
+        self._refresh_ranks_in_campaigns(self.campaign_id)
+
+    @api.model
+    def _refresh_ranks_in_campaigns(self, campaigns):
+        """Recalcul du rang des candidatures des campagnes données
+
+        Un seul UPDATE par fonction de fenêtre, limité aux campagnes concernées
+        et aux lignes dont le rang change réellement. Seules les candidatures
+        en compétition ou départagées (``_RANKED_STATES``) sont classées ;
+        le rang des autres (brouillon, en révision) est effacé.
+        """
+        campaign_ids = tuple(set(campaigns.ids))
+        if not campaign_ids:
+            return
+
+        self.flush_model(['campaign_id', 'state', 'total_score', 'submission_date'])
+        self.env.cr.execute(f"""
+            UPDATE ong_application application
+               SET rank_in_campaign = ranking.rank
+              FROM (
+                    SELECT id,
+                           CASE WHEN state IN %s THEN
+                                ROW_NUMBER() OVER (PARTITION BY campaign_id, state IN %s ORDER BY {self._RANKING_ORDER})
+                           END AS rank
+                      FROM ong_application
+                     WHERE campaign_id IN %s
+                   ) ranking
+             WHERE application.id = ranking.id
+               AND application.rank_in_campaign IS DISTINCT FROM ranking.rank
+        """, [self._RANKED_STATES, self._RANKED_STATES, campaign_ids])
+        self.invalidate_model(['rank_in_campaign'])
+
+    def _get_criterion_dependencies(self, criterion):
+        """Champs de la candidature dont dépend le score d'un critère (instantané)"""
+        if criterion.formula:
+            dependencies = set()
+            for name in criterion.formula.co_names:
+                if name in self._MEASURE_DEPENDENCIES:
+                    dependencies |= self._MEASURE_DEPENDENCIES[name]
+                elif name in self._SCORING_FIELDS:
+                    dependencies.add(name)
+            return dependencies
+        if criterion.bracket_table:
+            return self._MEASURE_DEPENDENCIES.get(criterion.bracket_table.measure, set())
+        return self._CRITERION_DEPENDENCIES.get(criterion.code, set())
+
+    def _get_criterion_scorers(self):
+        """Registre des fonctions de score par code de critère
+
+        Chaque fonction reçoit ``(values, max_score)`` et retourne un score.
+        Les modules dépendants étendent ce registre en surchargeant la méthode
+        et en complétant le dictionnaire retourné par ``super()``. Les barèmes
+        par défaut des critères standards y sont enregistrés : seuls une formule
+        ou des paliers propres au critère ont priorité.
+        """
+        scorers = {
+            code: partial(self._score_bracket_table, bracket_table)
+            for code, bracket_table in DEFAULT_BRACKET_TABLES.items()
+        }
+        scorers.update({
+            'documents': self._score_documents,
+            'completeness': self._score_completeness,
+        })
+        return scorers
+
+    def _calculate_criterion_score(self, criterion, values=None, scorers=None):
+        """Calcul du score pour un critère donné
+
+        ``criterion`` est un critère ou son instantané (``CriterionSnapshot``).
+        ``values`` contient les champs lus par ``_read_scoring_values`` ; il est
+        relu pour la candidature courante lorsqu'il n'est pas fourni.
+        Ordre de résolution : formule, paliers propres au critère, registre
+        des fonctions de score (dont les barèmes par défaut), puis score par défaut.
+        """
+        if isinstance(criterion, models.BaseModel):
+            criterion = criterion._get_snapshot()
+        if values is None:
+            values = self._read_scoring_values()[self.id]
+        if scorers is None:
+            scorers = self._get_criterion_scorers()
         score = 0.0
         
         try:
-            if criterion.code == 'experience':
-                score = self._score_experience(criterion.max_score)
-            elif criterion.code == 'budget':
-                score = self._score_budget(criterion.max_score)
-            elif criterion.code == 'staff':
-                score = self._score_staff(criterion.max_score)
-            elif criterion.code == 'documents':
-                score = self._score_documents(criterion.max_score)
-            elif criterion.code == 'completeness':
-                score = self._score_completeness(criterion.max_score)
-            elif criterion.code == 'activity_domains':
-                score = self._score_activity_domains(criterion.max_score)
+            bracket_table = criterion.bracket_table
+            if criterion.formula:
+                ratio = unsafe_eval(criterion.formula, {'__builtins__': _FORMULA_BUILTINS}, self._get_formula_values(values))
+                score = criterion.max_score * max(float(ratio), 0.0)
+            elif bracket_table:
+                score = self._score_bracket_table(bracket_table, values, criterion.max_score)
+            elif criterion.code in scorers:
+                score = scorers[criterion.code](values, criterion.max_score)
             else:
                 # Critère personnalisé ou non reconnu
                 score = criterion.max_score * 0.5  # Score par défaut
@@ -225,67 +786,37 @@ class OngApplication(models.Model):
         
         return round(min(score, criterion.max_score), 2)  # S'assurer de ne pas dépasser le max
 
-    def _score_experience(self, max_score):
-        """Score basé sur l'expérience"""
-        if self.years_experience >= 10:
-            return max_score
-        elif self.years_experience >= 5:
-            return max_score * 0.8
-        elif self.years_experience >= 3:
-            return max_score * 0.6
-        elif self.years_experience >= 1:
-            return max_score * 0.4
-        else:
-            return 0.0
+    def _get_scoring_measure(self, measure, values):
+        """Valeur de la candidature comparée aux paliers d'un critère"""
+        if measure == 'years_experience':
+            return values['years_experience'] or 0
+        elif measure == 'annual_budget':
+            return values['annual_budget'] or 0.0
+        elif measure == 'staff_total':
+            return (values['staff_count'] or 0) + (values['volunteer_count'] or 0)
+        elif measure == 'document_count':
+            return values['document_count'] or 0
+        elif measure == 'activity_domain_count':
+            return len(values['activity_domains'])
+        return 0
 
-    def _score_budget(self, max_score):
-        """Score basé sur le budget"""
-        if not self.annual_budget:
-            return 0.0
-            
-        if self.annual_budget >= 1000000:
-            return max_score
-        elif self.annual_budget >= 500000:
-            return max_score * 0.8
-        elif self.annual_budget >= 100000:
-            return max_score * 0.6
-        elif self.annual_budget >= 50000:
-            return max_score * 0.4
-        elif self.annual_budget >= 10000:
-            return max_score * 0.2
-        else:
-            return 0.0
+    def _get_formula_values(self, values):
+        """Variables disponibles dans une formule : champs lus et grandeurs mesurées"""
+        formula_values = dict(values)
+        for measure in self._MEASURE_DEPENDENCIES:
+            formula_values[measure] = self._get_scoring_measure(measure, values)
+        return formula_values
 
-    def _score_staff(self, max_score):
-        """Score basé sur les ressources humaines"""
-        total_people = (self.staff_count or 0) + (self.volunteer_count or 0)
-        
-        if total_people >= 100:
-            return max_score
-        elif total_people >= 50:
-            return max_score * 0.8
-        elif total_people >= 20:
-            return max_score * 0.6
-        elif total_people >= 10:
-            return max_score * 0.4
-        elif total_people >= 5:
-            return max_score * 0.2
-        else:
-            return 0.0
+    def _score_bracket_table(self, bracket_table, values, max_score):
+        """Score selon une table de paliers"""
+        return max_score * bracket_table.ratio(self._get_scoring_measure(bracket_table.measure, values))
 
-    def _score_documents(self, max_score):
+    def _score_documents(self, values, max_score):
         """Score basé sur les documents fournis"""
-        doc_count = 0
-        if self.statute_document:
-            doc_count += 1
-        if self.certificate_document:
-            doc_count += 1
-        if self.financial_report:
-            doc_count += 1
-        
+        doc_count = self._get_scoring_measure('document_count', values)
         return (doc_count / 3.0) * max_score
 
-    def _score_completeness(self, max_score):
+    def _score_completeness(self, values, max_score):
         """Score basé sur la complétude du profil"""
         fields_to_check = {
             # Champs obligatoires (poids 2)
@@ -300,49 +831,44 @@ class OngApplication(models.Model):
         filled_weight = 0
         
         for field, weight in fields_to_check.items():
-            value = getattr(self, field)
+            value = values[field]
             if value and (not isinstance(value, str) or value.strip()):
                 filled_weight += weight
         
         # Ajouter le poids des champs relationnels
-        if self.country_id:
+        if values['country_id']:
             filled_weight += 1.5
-        if self.activity_domains:
+        if values['activity_domains']:
             filled_weight += 2
         
         total_weight += 3.5  # Poids des champs relationnels
         
         return (filled_weight / total_weight) * max_score
 
-    def _score_activity_domains(self, max_score):
-        """Score basé sur le nombre de domaines d'activité"""
-        domain_count = len(self.activity_domains)
-        
-        if domain_count >= 3:
-            return max_score
-        elif domain_count == 2:
-            return max_score * 0.7
-        elif domain_count == 1:
-            return max_score * 0.5
-        else:
-            return 0.0
-
     def _send_submission_notification(self):
-        """Envoyer une notification de soumission"""
+        """Envoyer une notification de soumission
+
+        Exécuté par la file de traitements : les emails passent par la file
+        d'envoi et les erreurs remontent pour que la tâche soit réessayée.
+        """
+        template = self.env.ref('recrutement_ongs.email_template_application_submitted', raise_if_not_found=False)
         for record in self:
-            try:
-                # Notification par email (si configuré)
-                template = self.env.ref('recrutement_ongs.email_template_application_submitted', raise_if_not_found=False)
-                if template:
-                    template.send_mail(record.id, force_send=True)
-                
-                # Message dans le chatter
-                record.message_post(
-                    body=f"Candidature soumise avec succès le {fields.Datetime.now().strftime('%d/%m/%Y à %H:%M')}",
-                    message_type='notification'
-                )
-            except Exception as e:
-                _logger.warning(f"Erreur lors de l'envoi de la notification pour la candidature {record.id}: {str(e)}")
+            # Notification par email (si configuré)
+            if template:
+                template.send_mail(record.id)
+            
+            # Message dans le chatter
+            body = "Candidature soumise avec succès"
+            if record.submission_date:
+                body += f" le {record.submission_date.strftime('%d/%m/%Y à %H:%M')}"
+            record.message_post(body=body, message_type='notification')
+
+    @api.autovacuum
+    def _gc_admission_buckets(self):
+        """Supprimer les seaux d'admission des adresses inactives"""
+        removed = prune_admission_buckets(self.env)
+        if removed:
+            _logger.info(f"Suppression de {removed} seaux d'admission inactifs")
 
     def action_review(self):
         """Passer la candidature en révision"""
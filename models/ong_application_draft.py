@@ -0,0 +1,117 @@
+# models/ong_application_draft.py
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+import secrets
+
+_logger = logging.getLogger(__name__)
+
+class OngApplicationDraft(models.Model):
+    _name = 'ong.application.draft'
+    _description = 'Brouillon de Candidature en Ligne'
+    _order = 'write_date desc'
+
+    # Champs du formulaire public conservés dans un brouillon
+    _FORM_FIELDS = frozenset([
+        'organization_name', 'email', 'phone', 'website', 'street', 'city', 'country_id',
+        'registration_number', 'legal_status', 'main_activities', 'annual_budget',
+        'funding_sources', 'staff_count', 'volunteer_count', 'years_experience',
+        'previous_projects', 'references', 'activity_domains',
+    ])
+    _DOCUMENT_FIELDS = ('statute_document', 'certificate_document', 'financial_report')
+    # Longueur maximale d'une valeur saisie et durée de conservation des brouillons
+    _MAX_VALUE_LENGTH = 10000
+    _EXPIRY_DAYS = 30
+
+    token = fields.Char('Jeton de Reprise', required=True, readonly=True, copy=False, index=True,
+                        default=lambda self: secrets.token_urlsafe(32))
+    campaign_id = fields.Many2one('ong.recruitment.campaign', string='Campagne', required=True,
+                                  ondelete='cascade', index=True)
+    data = fields.Json('Données Saisies', default=dict)
+
+    # Documents déjà transmis, conservés en pièces jointes jusqu'à la soumission
+    statute_document = fields.Binary('Statuts de l\'ONG', attachment=True)
+    certificate_document = fields.Binary('Certificat d\'Enregistrement', attachment=True)
+    financial_report = fields.Binary('Rapport Financier', attachment=True)
+
+    _sql_constraints = [
+        ('token_uniq', 'unique(token)', 'Le jeton de reprise doit être unique'),
+    ]
+
+    @api.model
+    def _get_by_token(self, campaign, token):
+        """Brouillon d'une campagne correspondant au jeton (vide si inconnu)"""
+        if not token or not isinstance(token, str):
+            return self.browse()
+        return self.search([('token', '=', token), ('campaign_id', '=', campaign.id)], limit=1)
+
+    def _apply_changes(self, changes):
+        """Fusionner les champs modifiés dans les données du brouillon"""
+        cleaned = {}
+        for field, value in (changes or {}).items():
+            if field not in self._FORM_FIELDS:
+                continue
+            if isinstance(value, (list, tuple)):
+                cleaned[field] = [str(item)[:self._MAX_VALUE_LENGTH] for item in value]
+            elif isinstance(value, (str, int, float)):
+                cleaned[field] = str(value)[:self._MAX_VALUE_LENGTH]
+        if cleaned:
+            self.data = dict(self.data or {}, **cleaned)
+
+    def _store_documents(self, uploads):
+        """Conserver les documents transmis ``{champ: (nom du fichier, contenu brut)}``"""
+        if not uploads:
+            return
+        Attachment = self.env['ir.attachment'].sudo()
+        Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', 'in', list(uploads)),
+        ]).unlink()
+        Attachment.create([{
+            'name': field,
+            'res_model': self._name,
+            'res_field': field,
+            'res_id': self.id,
+            'type': 'binary',
+            'raw': content,
+        } for field, (_filename, content) in uploads.items()])
+        self.invalidate_recordset(list(uploads))
+        self.data = dict(self.data or {}, **{
+            f'{field}_name': filename for field, (filename, _content) in uploads.items()
+        })
+
+    def _get_document_names(self):
+        """Noms des documents déjà conservés, par champ"""
+        attachments = self.env['ir.attachment'].sudo().search_read([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', 'in', list(self._DOCUMENT_FIELDS)),
+        ], ['res_field'])
+        data = self.data or {}
+        return {
+            attachment['res_field']: data.get(f"{attachment['res_field']}_name") or attachment['res_field']
+            for attachment in attachments
+        }
+
+    def _transfer_documents(self, application, field_names):
+        """Rattacher les documents conservés à la candidature, sans recopier leur contenu"""
+        if not field_names:
+            return
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', 'in', list(field_names)),
+        ]).write({'res_model': application._name, 'res_id': application.id})
+        self.invalidate_recordset(list(field_names))
+        application.invalidate_recordset(list(field_names))
+        application.modified(list(field_names))
+
+    @api.autovacuum
+    def _gc_expired_drafts(self):
+        """Supprimer les brouillons abandonnés"""
+        expired = self.search([('write_date', '<', fields.Datetime.now() - timedelta(days=self._EXPIRY_DAYS))])
+        if expired:
+            _logger.info(f"Suppression de {len(expired)} brouillons de candidature expirés")
+            expired.unlink()
@@ -0,0 +1,129 @@
+# models/ong_application_job.py
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+class OngApplicationJob(models.Model):
+    _name = 'ong.application.job'
+    _description = 'Traitement Différé de Candidature'
+    _order = 'scheduled_date, id'
+
+    # Nombre maximal de réessais avant abandon, taille des lots traités par le cron
+    _MAX_RETRIES = 5
+    _BATCH_SIZE = 200
+    _MAX_BATCHES_PER_RUN = 10
+
+    application_id = fields.Many2one('ong.application', string='Candidature', required=True,
+                                     ondelete='cascade', index=True)
+    job_type = fields.Selection([
+        ('evaluate', 'Évaluation automatique'),
+        ('notify', 'Notification de soumission'),
+    ], string='Traitement', required=True)
+    state = fields.Selection([
+        ('pending', 'En attente'),
+        ('done', 'Terminé'),
+        ('failed', 'Échec'),
+    ], string='État', default='pending', required=True, index=True)
+    scheduled_date = fields.Datetime('Planifié le', required=True, default=fields.Datetime.now, index=True)
+    done_date = fields.Datetime('Terminé le')
+    retry_count = fields.Integer('Réessais', default=0)
+    last_error = fields.Text('Dernière Erreur')
+
+    @api.model
+    def _enqueue(self, applications, job_types):
+        """Mettre en file les traitements d'un lot de candidatures et réveiller le cron"""
+        jobs = self.sudo().create([
+            {'application_id': application.id, 'job_type': job_type}
+            for application in applications
+            for job_type in job_types
+        ])
+        cron = self.env.ref('recrutement_ongs.cron_process_application_jobs', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Méthode cron : traiter les tâches en attente par lots
+
+        Chaque lot est validé séparément. Les évaluations sont traitées avant
+        les notifications d'un même lot.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        for _batch in range(self._MAX_BATCHES_PER_RUN):
+            jobs = self.search([
+                ('state', '=', 'pending'),
+                ('scheduled_date', '<=', fields.Datetime.now()),
+            ], limit=self._BATCH_SIZE)
+            if not jobs:
+                return
+
+            for job_type in ('evaluate', 'notify'):
+                jobs.filtered(lambda j: j.job_type == job_type)._run()
+
+            if auto_commit:
+                self.env.cr.commit()
+
+        # Il reste du travail : replanifier plutôt que monopoliser le worker
+        self.env.ref('recrutement_ongs.cron_process_application_jobs')._trigger()
+
+    def _run(self):
+        """Exécuter un lot de tâches du même type
+
+        Le lot est d'abord exécuté en une fois ; en cas d'erreur, chaque tâche
+        est rejouée isolément pour n'écarter que celles qui échouent.
+        """
+        if not self:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self._execute()
+            self.write({'state': 'done', 'done_date': fields.Datetime.now(), 'last_error': False})
+            return
+        except Exception as e:
+            if len(self) == 1:
+                self._mark_failed(e)
+                return
+
+        for job in self:
+            try:
+                with self.env.cr.savepoint():
+                    job._execute()
+                job.write({'state': 'done', 'done_date': fields.Datetime.now(), 'last_error': False})
+            except Exception as e:
+                job._mark_failed(e)
+
+    def _execute(self):
+        """Traitement effectif, groupé sur l'ensemble des candidatures du lot"""
+        applications = self.application_id
+        job_types = set(self.mapped('job_type'))
+        if 'evaluate' in job_types:
+            applications._auto_evaluate()
+        if 'notify' in job_types:
+            applications._send_submission_notification()
+
+    def _mark_failed(self, error):
+        """Enregistrer l'échec et replanifier avec un délai exponentiel"""
+        error = f"{type(error).__name__}: {error}"
+        for job in self:
+            retry_count = job.retry_count + 1
+            _logger.warning(f"Échec du traitement {job.job_type} de la candidature {job.application_id.id}: {error}")
+            job.write({
+                'retry_count': retry_count,
+                'last_error': error,
+                'state': 'failed' if retry_count >= self._MAX_RETRIES else 'pending',
+                'scheduled_date': fields.Datetime.now() + timedelta(minutes=2 ** retry_count),
+            })
+
+    def action_retry(self):
+        """Relancer manuellement des tâches en échec"""
+        self.write({'state': 'pending', 'retry_count': 0, 'scheduled_date': fields.Datetime.now()})
+        cron = self.env.ref('recrutement_ongs.cron_process_application_jobs', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
@@ -1,12 +1,97 @@
 # models/ong_evaluation_criteria.py
 # -*- coding: utf-8 -*-
-from odoo import models, fields
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+from odoo.tools.safe_eval import test_expr, test_python_expr, _SAFE_OPCODES
+from bisect import bisect_right
+from collections import namedtuple
+
+# Paliers historiques (seuil minimal, ratio du score maximum) utilisés
+# lorsqu'un critère standard ne définit pas ses propres paliers
+DEFAULT_BRACKETS = {
+    'experience': [(1, 0.4), (3, 0.6), (5, 0.8), (10, 1.0)],
+    'budget': [(10000, 0.2), (50000, 0.4), (100000, 0.6), (500000, 0.8), (1000000, 1.0)],
+    'staff': [(5, 0.2), (10, 0.4), (20, 0.6), (50, 0.8), (100, 1.0)],
+    'activity_domains': [(1, 0.5), (2, 0.7), (3, 1.0)],
+}
+
+# Grandeur mesurée par défaut pour chaque code de critère standard
+DEFAULT_MEASURES = {
+    'experience': 'years_experience',
+    'budget': 'annual_budget',
+    'staff': 'staff_total',
+    'documents': 'document_count',
+    'activity_domains': 'activity_domain_count',
+}
+
+
+class BracketTable(namedtuple('BracketTable', ['measure', 'thresholds', 'ratios'])):
+    """Table de paliers compilée : seuils triés et ratios correspondants"""
+    __slots__ = ()
+
+    def ratio(self, value):
+        """Ratio du palier applicable, trouvé par recherche dichotomique"""
+        index = bisect_right(self.thresholds, value)
+        return self.ratios[index - 1] if index else 0.0
+
+    @classmethod
+    def from_pairs(cls, measure, pairs):
+        """Table compilée à partir de paires (seuil, ratio) triées"""
+        return cls(
+            measure,
+            tuple(threshold for threshold, _ratio in pairs),
+            tuple(ratio for _threshold, ratio in pairs),
+        )
+
+
+# Barèmes par défaut compilés, enregistrés comme fonctions de score des critères standards
+DEFAULT_BRACKET_TABLES = {
+    code: BracketTable.from_pairs(DEFAULT_MEASURES[code], pairs)
+    for code, pairs in DEFAULT_BRACKETS.items()
+}
+
+
+# Instantané immuable d'un critère, partagé par tous les calculs de score
+CriterionSnapshot = namedtuple('CriterionSnapshot', ['id', 'code', 'max_score', 'weight', 'bracket_table', 'formula'])
+
+
+class OngScoringCacheMixin(models.AbstractModel):
+    """Invalidation du cache (ormcache) des données de scoring et de validation
+
+    Le cache du registre n'est vidé qu'à la création, à la suppression ou à la
+    modification d'un des champs ``_CACHED_FIELDS`` lus par les méthodes en cache.
+    """
+    _name = 'ong.scoring.cache.mixin'
+    _description = 'Invalidation du Cache de Scoring'
+
+    _CACHED_FIELDS = frozenset()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._CACHED_FIELDS.intersection(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
 
 class OngEvaluationCriteria(models.Model):
     _name = 'ong.evaluation.criteria'
+    _inherit = ['ong.scoring.cache.mixin']
     _description = 'Critères d\'Évaluation ONG'
     _order = 'sequence, name'
 
+    _CACHED_FIELDS = frozenset(['code', 'max_score', 'weight', 'active', 'measure', 'formula', 'bracket_ids'])
+
     name = fields.Char('Nom du Critère', required=True)
     code = fields.Char('Code', required=True)
     description = fields.Text('Description')
@@ -15,6 +100,78 @@ class OngEvaluationCriteria(models.Model):
     sequence = fields.Integer('Séquence', default=10)
     active = fields.Boolean('Actif', default=True)
 
+    # Barème par paliers
+    measure = fields.Selection([
+        ('years_experience', 'Années d\'expérience'),
+        ('annual_budget', 'Budget annuel'),
+        ('staff_total', 'Employés et bénévoles'),
+        ('document_count', 'Documents fournis'),
+        ('activity_domain_count', 'Domaines d\'activité'),
+    ], string='Grandeur Mesurée',
+        help="Valeur de la candidature comparée aux paliers. Par défaut, déduite du code du critère.")
+    bracket_ids = fields.One2many('ong.evaluation.criteria.bracket', 'criterion_id', string='Paliers')
+
+    # Formule personnalisée
+    formula = fields.Char('Formule',
+        help="Expression évaluée sur les champs de la candidature et retournant un ratio "
+             "du score maximum entre 0 et 1, par exemple : min(staff_count / 10, 1)")
+
+    @api.constrains('formula')
+    def _check_formula(self):
+        for record in self:
+            if record.formula:
+                error = test_python_expr(expr=record.formula.strip(), mode='eval')
+                if error:
+                    raise ValidationError(f"Formule invalide pour le critère {record.name} :\n{error}")
+
+    @api.model
+    @tools.ormcache('formula')
+    def _compile_formula(self, formula):
+        """Compile une formule une seule fois après contrôle des opcodes autorisés"""
+        return test_expr(formula, _SAFE_OPCODES, mode='eval')
+
+    @tools.ormcache('self.id')
+    def _get_bracket_table(self):
+        """Paliers propres au critère compilés en table triée (None sans paliers)
+
+        Les barèmes par défaut des critères standards ne sont pas repris ici :
+        ils passent par le registre des fonctions de score, que d'autres
+        modules peuvent surcharger.
+        """
+        measure = self.measure or DEFAULT_MEASURES.get(self.code)
+        if not measure or not self.bracket_ids:
+            return None
+        return BracketTable.from_pairs(
+            measure, sorted((bracket.threshold, bracket.ratio) for bracket in self.bracket_ids))
+
+    def _get_snapshot(self):
+        """Instantané immuable du critère (identifiant, code, barème et formule compilés)"""
+        return CriterionSnapshot(
+            self.id, self.code, self.max_score, self.weight,
+            self._get_bracket_table(),
+            self._compile_formula(self.formula.strip()) if self.formula else None,
+        )
+
+
+class OngEvaluationCriteriaBracket(models.Model):
+    _name = 'ong.evaluation.criteria.bracket'
+    _inherit = ['ong.scoring.cache.mixin']
+    _description = 'Palier de Critère d\'Évaluation'
+    _order = 'criterion_id, threshold'
+
+    _CACHED_FIELDS = frozenset(['criterion_id', 'threshold', 'ratio'])
+
+    criterion_id = fields.Many2one('ong.evaluation.criteria', string='Critère', required=True, ondelete='cascade')
+    threshold = fields.Float('Seuil Minimum', required=True)
+    ratio = fields.Float('Ratio du Score Maximum', required=True,
+                         help="Part du score maximum attribuée à partir de ce seuil (entre 0 et 1)")
+
+    @api.constrains('ratio')
+    def _check_ratio(self):
+        for record in self:
+            if not 0.0 <= record.ratio <= 1.0:
+                raise ValidationError("Le ratio d'un palier doit être compris entre 0 et 1")
+
 
 class OngApplicationEvaluation(models.Model):
     _name = 'ong.application.evaluation'
@@ -25,11 +182,42 @@ class OngApplicationEvaluation(models.Model):
     score = fields.Float('Score', required=True)
     notes = fields.Text('Notes')
 
+    # Le rang des candidatures est recalculé à chaque modification de score,
+    # sauf pour le moteur de scoring qui le recalcule une fois par lot
+    @api.model_create_multi
+    def create(self, vals_list):
+        evaluations = super().create(vals_list)
+        if not self.env.context.get('skip_rank_refresh'):
+            evaluations.application_id._refresh_campaign_ranks()
+        return evaluations
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'score' in vals and not self.env.context.get('skip_rank_refresh'):
+            self.application_id._refresh_campaign_ranks()
+        return res
+
+    def unlink(self):
+        applications = self.application_id
+        res = super().unlink()
+        if not self.env.context.get('skip_rank_refresh'):
+            applications.exists()._refresh_campaign_ranks()
+        return res
+
 
 class OngActivityDomain(models.Model):
     _name = 'ong.activity.domain'
+    _inherit = ['ong.scoring.cache.mixin']
     _description = 'Domaine d\'Activité ONG'
 
+    _CACHED_FIELDS = frozenset(['active'])
+
     name = fields.Char('Nom', required=True)
     description = fields.Text('Description')
-    active = fields.Boolean('Actif', default=True)
\ No newline at end of file
+    active = fields.Boolean('Actif', default=True)
+
+    @api.model
+    @tools.ormcache()
+    def _get_active_domain_ids(self):
+        """Identifiants des domaines actifs, en cache jusqu'à la prochaine modification"""
+        return frozenset(self.sudo().search([('active', '=', True)]).ids)
@@ -1,11 +1,17 @@
 # models/ong_recruitment_campaign.py
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from odoo.osv import expression
+from odoo.tools import split_every, SQL
 from datetime import datetime, timedelta
+import base64
+import json
 import logging
+import threading
 import html
 from markupsafe import Markup
 import re
+from ..tools.fragment_cache import campaign_fragments
 
 _logger = logging.getLogger(__name__)
 
@@ -15,9 +21,17 @@ class OngRecruitmentCampaign(models.Model):
     _inherit = ['mail.thread', 'mail.activity.mixin']
     _order = 'create_date desc'
 
+    # Taille des lots de rendu des notifications de décision
+    _NOTIFICATION_BATCH_SIZE = 500
+    # Document plein texte indexé : l'expression doit être identique dans l'index et les requêtes
+    _FULLTEXT_INDEX = 'ong_recruitment_campaign_fulltext_idx'
+    _FULLTEXT_DOCUMENT = "to_tsvector('french', coalesce(name, '') || ' ' || coalesce(description_text, ''))"
+    # Ordre de la liste publique, servant aussi de clé de pagination
+    _PAGE_ORDER = 'state desc, end_date asc, id asc'
+
     name = fields.Char('Nom de la Campagne', required=True, tracking=True)
     description = fields.Html('Description', sanitize_attributes=True, sanitize_style=True)
-    description_text = fields.Text('Description (Texte)', compute='_compute_description_text', store=False)
+    description_text = fields.Text('Description (Texte)', compute='_compute_description_text', store=True)
     start_date = fields.Datetime('Date de Début', required=True, tracking=True)
     end_date = fields.Datetime('Date de Fin', required=True, tracking=True)
     max_selections = fields.Integer('Nombre d\'ONGs à Sélectionner', required=True, default=5)
@@ -35,6 +49,8 @@ class OngRecruitmentCampaign(models.Model):
     # Compteurs
     total_applications = fields.Integer('Total Candidatures', compute='_compute_statistics')
     selected_applications = fields.Integer('ONGs Sélectionnées', compute='_compute_statistics')
+    ranked_applications = fields.Integer('Candidatures Classées', compute='_compute_statistics',
+                                         help="Candidatures soumises ou départagées, base du rang affiché")
     
     # Configuration
     auto_selection = fields.Boolean('Sélection Automatique', default=True)
@@ -55,6 +71,103 @@ class OngRecruitmentCampaign(models.Model):
             else:
                 record.description_text = False
 
+    def init(self):
+        """Index GIN de recherche plein texte sur le nom et la description"""
+        super().init()
+        if not tools.index_exists(self.env.cr, self._FULLTEXT_INDEX):
+            tools.create_index(self.env.cr, self._FULLTEXT_INDEX, self._table, [self._FULLTEXT_DOCUMENT], method='gin')
+
+    @api.model
+    def _fulltext_tsquery(self, term):
+        """Requête plein texte : chaque mot est recherché comme préfixe (None si aucun mot)"""
+        words = re.findall(r'\w+', term or '')
+        return ' & '.join(f'{word}:*' for word in words) or None
+
+    @api.model
+    def _fulltext_search_ids(self, term, domain=None, limit=None, offset=0):
+        """Identifiants des campagnes du domaine correspondant à ``term``, triés par pertinence
+
+        La recherche utilise la configuration française.
+        """
+        tsquery = self._fulltext_tsquery(term)
+        if not tsquery:
+            return []
+        self.flush_model(['name', 'description_text'])
+        document = SQL(self._FULLTEXT_DOCUMENT)
+        self.env.cr.execute(SQL("""
+            SELECT id FROM ong_recruitment_campaign
+             WHERE id IN (%s)
+               AND %s @@ to_tsquery('french', %s)
+             ORDER BY ts_rank(%s, to_tsquery('french', %s)) DESC, id DESC
+             LIMIT %s OFFSET %s
+        """, self._search(domain or []).subselect(), document, tsquery, document, tsquery, limit, offset))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _fulltext_search_count(self, term, domain=None):
+        """Nombre de campagnes du domaine correspondant à ``term``"""
+        tsquery = self._fulltext_tsquery(term)
+        if not tsquery:
+            return 0
+        self.flush_model(['name', 'description_text'])
+        self.env.cr.execute(SQL("""
+            SELECT COUNT(*) FROM ong_recruitment_campaign
+             WHERE id IN (%s)
+               AND %s @@ to_tsquery('french', %s)
+        """, self._search(domain or []).subselect(), SQL(self._FULLTEXT_DOCUMENT), tsquery))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _search_page(self, domain, limit, cursor=None, term=None):
+        """Une page de campagnes et le curseur opaque de la page suivante (None en fin de liste)
+
+        Sans recherche, la pagination se fait par clé (état, date de fin,
+        identifiant) et reste stable quelle que soit la profondeur ; les
+        résultats triés par pertinence utilisent un curseur de décalage.
+        """
+        position = self._decode_page_cursor(cursor)
+        if term:
+            offset = position.get('offset', 0)
+            ids = self._fulltext_search_ids(term, domain, limit=limit + 1, offset=offset)
+            next_cursor = self._encode_page_cursor({'offset': offset + limit}) if len(ids) > limit else None
+            return self.browse(ids[:limit]), next_cursor
+
+        page_domain = domain
+        if 'key' in position:
+            state, end_date, last_id = position['key']
+            page_domain = expression.AND([domain, [
+                '|', ('state', '<', state),
+                '&', ('state', '=', state),
+                '|', ('end_date', '>', end_date),
+                '&', ('end_date', '=', end_date), ('id', '>', last_id),
+            ]])
+        campaigns = self.search(page_domain, order=self._PAGE_ORDER, limit=limit + 1)
+        if len(campaigns) <= limit:
+            return campaigns, None
+        campaigns = campaigns[:limit]
+        last = campaigns[-1]
+        return campaigns, self._encode_page_cursor({
+            'key': [last.state, fields.Datetime.to_string(last.end_date), last.id],
+        })
+
+    @api.model
+    def _encode_page_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    @api.model
+    def _decode_page_cursor(self, cursor):
+        """Position décodée d'un curseur ; un curseur invalide renvoie au début de la liste"""
+        if not cursor:
+            return {}
+        try:
+            position = json.loads(base64.urlsafe_b64decode(str(cursor).encode()))
+            if 'offset' in position:
+                return {'offset': max(int(position['offset']), 0)}
+            state, end_date, last_id = position['key']
+            return {'key': [str(state), fields.Datetime.to_string(fields.Datetime.to_datetime(end_date)), int(last_id)]}
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return {}
+
     def get_description_preview(self, max_length=150):
         """Retourne un aperçu de la description sans HTML"""
         if not self.description_text:
@@ -81,11 +194,64 @@ class OngRecruitmentCampaign(models.Model):
         from odoo.tools import html_sanitize
         return Markup(html_sanitize(self.description))
     
-    @api.depends('application_ids')
+    @tools.ormcache('self.id')
+    def _get_criteria_snapshot(self):
+        """Critères actifs de la campagne, résolus une fois par version
+
+        L'instantané est invalidé avec le cache du registre dès qu'un critère,
+        un palier ou la liste des critères de la campagne change.
+        """
+        return tuple(criterion._get_snapshot() for criterion in self.criteria_ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        campaigns = super().create(vals_list)
+        campaigns._schedule_deadline_check()
+        return campaigns
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'criteria_ids' in vals:
+            self.env.registry.clear_cache()
+        if 'state' in vals or 'end_date' in vals:
+            self._schedule_deadline_check()
+        # Les fragments rendus de ces campagnes sont obsolètes dans ce worker
+        campaign_fragments.invalidate(self.env.cr.dbname, self.ids)
+        return res
+
+    def _schedule_deadline_check(self):
+        """Planifier la vérification des échéances à la date de fin exacte des campagnes ouvertes"""
+        deadlines = self.filtered(lambda c: c.state == 'open' and c.end_date).mapped('end_date')
+        if not deadlines:
+            return
+        cron = self.env.ref('recrutement_ongs.cron_check_campaign_deadlines', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at=deadlines)
+
+    @api.depends('application_ids', 'application_ids.state')
     def _compute_statistics(self):
+        """Statistiques de toutes les campagnes du lot en une seule requête groupée"""
+        total_counts = {}
+        selected_counts = {}
+        ranked_counts = {}
+        ranked_states = self.env['ong.application']._RANKED_STATES
+        campaign_ids = [campaign_id for campaign_id in self.ids if isinstance(campaign_id, int)]
+        if campaign_ids:
+            groups = self.env['ong.application']._read_group(
+                [('campaign_id', 'in', campaign_ids)],
+                groupby=['campaign_id', 'state'],
+                aggregates=['__count'],
+            )
+            for campaign, state, count in groups:
+                total_counts[campaign.id] = total_counts.get(campaign.id, 0) + count
+                if state == 'selected':
+                    selected_counts[campaign.id] = count
+                if state in ranked_states:
+                    ranked_counts[campaign.id] = ranked_counts.get(campaign.id, 0) + count
         for campaign in self:
-            campaign.total_applications = len(campaign.application_ids)
-            campaign.selected_applications = len(campaign.application_ids.filtered(lambda a: a.state == 'selected'))
+            campaign.total_applications = total_counts.get(campaign.id, 0)
+            campaign.selected_applications = selected_counts.get(campaign.id, 0)
+            campaign.ranked_applications = ranked_counts.get(campaign.id, 0)
 
     def action_open_campaign(self):
         """Ouvrir la campagne aux candidatures"""
@@ -103,41 +269,121 @@ class OngRecruitmentCampaign(models.Model):
         self.state = 'closed'
         self.message_post(body="Campagne fermée")
 
-    def _auto_select_ongs(self):
-        """Sélection automatique des meilleures ONGs"""
-        applications = self.application_ids.filtered(lambda a: a.state == 'submitted')
-        
-        # Calculer les scores pour toutes les candidatures
-        for application in applications:
-            application._compute_total_score()
-        
-        # Trier par score décroissant
-        sorted_applications = applications.sorted('total_score', reverse=True)
-        
-        # Sélectionner les meilleures
-        selected = sorted_applications[:self.max_selections]
-        rejected = sorted_applications[self.max_selections:]
-        
-        selected.write({'state': 'selected'})
-        rejected.write({'state': 'rejected'})
-        
+    def _auto_select_ongs(self, dry_run=False):
+        """Sélection automatique des meilleures ONGs
+
+        Le classement est calculé en base par une fonction de fenêtre puis
+        appliqué par deux UPDATE ensemblistes, sans charger les candidatures.
+        En mode ``dry_run``, retourne le classement sans rien écrire.
+        """
+        self.ensure_one()
+        Application = self.env['ong.application']
+        Application.flush_model(['campaign_id', 'state', 'total_score', 'submission_date'])
+
+        ranking_query = f"""
+            SELECT id, total_score,
+                   ROW_NUMBER() OVER (ORDER BY {Application._RANKING_ORDER}) AS rank
+              FROM ong_application
+             WHERE campaign_id = %s AND state IN %s
+        """
+
+        if dry_run:
+            self.env.cr.execute(ranking_query + " ORDER BY rank", [self.id, Application._SELECTION_STATES])
+            return [{
+                'application_id': application_id,
+                'total_score': total_score,
+                'rank': rank,
+                'selected': rank <= self.max_selections,
+            } for application_id, total_score, rank in self.env.cr.fetchall()]
+
+        # Les meilleures candidatures sont sélectionnées...
+        self.env.cr.execute(f"""
+            WITH ranking AS ({ranking_query})
+            UPDATE ong_application application
+               SET state = 'selected',
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM ranking
+             WHERE application.id = ranking.id
+               AND ranking.rank <= %s
+         RETURNING application.id
+        """, [self.id, Application._SELECTION_STATES, self.env.uid, self.max_selections])
+        selected_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        # ... et les candidatures restantes sont rejetées
+        self.env.cr.execute("""
+            UPDATE ong_application
+               SET state = 'rejected',
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+             WHERE campaign_id = %s AND state IN %s
+         RETURNING id
+        """, [self.env.uid, self.id, Application._SELECTION_STATES])
+        rejected_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        # Les UPDATE contournent l'ORM : cache invalidé et champs dépendants de l'état notifiés
+        Application.invalidate_model(['state', 'write_uid', 'write_date'])
+        Application.browse(selected_ids + rejected_ids).modified(['state'])
+        self.invalidate_recordset(['total_applications', 'selected_applications', 'ranked_applications'])
+        Application._refresh_ranks_in_campaigns(self)
+
+        notified_count = self._send_decision_notifications(Application.browse(selected_ids), Application.browse(rejected_ids))
+
         self.message_post(
-            body=f"Sélection automatique effectuée: {len(selected)} ONGs sélectionnées sur {len(applications)} candidatures"
+            body=f"Sélection automatique effectuée: {len(selected_ids)} ONGs sélectionnées sur "
+                 f"{len(selected_ids) + len(rejected_ids)} candidatures ({notified_count} notifications envoyées)"
         )
 
+    def _send_decision_notifications(self, selected, rejected):
+        """Notifications de décision groupées
+
+        Chaque modèle est rendu en masse par lots, et les emails passent par la
+        file d'envoi, qui réutilise la connexion SMTP. Aucun message n'est publié
+        sur les candidatures. Retourne le nombre d'emails mis en file.
+        """
+        notified_count = 0
+        for applications, template_xmlid in (
+            (selected, 'recrutement_ongs.email_template_application_selected'),
+            (rejected, 'recrutement_ongs.email_template_application_rejected'),
+        ):
+            template = self.env.ref(template_xmlid, raise_if_not_found=False)
+            if not template or not applications:
+                continue
+            for application_ids in split_every(self._NOTIFICATION_BATCH_SIZE, applications.ids, list):
+                template.send_mail_batch(application_ids, force_send=False)
+                notified_count += len(application_ids)
+
+        if notified_count:
+            mail_cron = self.env.ref('mail.ir_cron_mail_scheduler_action', raise_if_not_found=False)
+            if mail_cron:
+                mail_cron.sudo()._trigger()
+        return notified_count
+
     @api.model
     def check_campaign_deadlines(self):
-        """Méthode cron pour vérifier les échéances"""
-        now = datetime.now()
+        """Méthode cron pour vérifier les échéances
+
+        Déclenchée à la date de fin exacte de chaque campagne. Chaque campagne
+        est fermée dans son propre savepoint puis validée, afin qu'une campagne
+        en erreur ne bloque pas les autres.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
         
         # Fermer automatiquement les campagnes expirées
         expired_campaigns = self.search([
             ('state', '=', 'open'),
-            ('end_date', '<', now)
+            ('end_date', '<=', fields.Datetime.now())
         ])
         
         for campaign in expired_campaigns:
-            campaign.action_close_applications()
+            try:
+                with self.env.cr.savepoint():
+                    campaign.action_close_applications()
+            except Exception as e:
+                _logger.error(f"Erreur lors de la fermeture automatique de la campagne {campaign.id}: {str(e)}")
+                continue
+            if auto_commit:
+                self.env.cr.commit()
 
     # Ajouter ces méthodes à la classe OngRecruitmentCampaign dans ong_recruitment_campaign.py
     def generate_campaign_excel_report(self):
@@ -260,24 +506,20 @@ class OngRecruitmentCampaign(models.Model):
             for col, header in enumerate(headers):
                 ws_apps.write(2, col, header, header_format)
             
-            # Trier les candidatures par score décroissant
-            applications_sorted = self.application_ids.sorted('total_score', reverse=True)
+            # Trier les candidatures selon leur rang dans la campagne
+            applications_sorted = self.env['ong.application'].search(
+                [('campaign_id', '=', self.id)], order='rank_in_campaign, id'
+            )
             
             # Données des candidatures
             for row, app in enumerate(applications_sorted, 3):
                 # Calculer le nombre de documents fournis
-                docs_count = sum([
-                    1 if hasattr(app, 'statute_document') and app.statute_document else 0,
-                    1 if hasattr(app, 'certificate_document') and app.certificate_document else 0,
-                    1 if hasattr(app, 'financial_report') and app.financial_report else 0,
-                ])
-                docs_status = f"{docs_count}/3"
+                docs_status = f"{app.document_count}/3"
                 
                 # Vérifier si l'ONG a été évaluée
-                evaluated = 'Oui' if hasattr(app, 'evaluation_ids') and app.evaluation_ids else 'Non'
+                evaluated = 'Oui' if app.is_evaluated else 'Non'
                 
-                # Rang basé sur le score
-                rank = row - 2
+                rank = app.rank_in_campaign or 0
                 
                 data = [
                     app.id,
@@ -0,0 +1,3 @@
+# tests/__init__.py
+# -*- coding: utf-8 -*-
+from . import test_website_application
@@ -0,0 +1,61 @@
+# tests/test_website_application.py
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from odoo.addons.website.tools import MockRequest
+from odoo.addons.recrutement_ongs.controllers.website_ong_recruitment import OngRecruitmentController
+
+
+@tagged('post_install', '-at_install')
+class TestWebsiteApplication(TransactionCase):
+    """Budget de requêtes d'une soumission de candidature depuis le site web"""
+
+    # Nombre maximal de requêtes d'une soumission (création, suivi et mise en file)
+    QUERY_BUDGET = 35
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.website = cls.env.ref('website.default_website')
+        cls.domain = cls.env['ong.activity.domain'].create({'name': 'Domaine de test'})
+        cls.campaign = cls.env['ong.recruitment.campaign'].create({
+            'name': 'Campagne de test',
+            'start_date': fields.Datetime.now() - timedelta(days=1),
+            'end_date': fields.Datetime.now() + timedelta(days=30),
+            'state': 'open',
+        })
+        cls.controller = OngRecruitmentController()
+
+    def _post_data(self, email):
+        return {
+            'organization_name': 'ONG de test',
+            'email': email,
+            'registration_number': 'REG-001',
+            'legal_status': 'association',
+            'main_activities': 'Activités de test',
+            'years_experience': '5',
+            'activity_domains': [str(self.domain.id)],
+        }
+
+    def _submit(self, email):
+        with MockRequest(self.env, website=self.website):
+            self.controller._process_application_enhanced(self.campaign, **self._post_data(email))
+
+    def test_submission_query_budget(self):
+        """Une soumission crée la candidature en un seul appel, dans le budget de requêtes"""
+        # Première soumission : remplissage des caches (schéma, paramètres, modèles de données)
+        self._submit('warmup@example.org')
+
+        with self.assertQueryCount(self.QUERY_BUDGET):
+            self._submit('budget@example.org')
+
+        application = self.env['ong.application'].search([
+            ('campaign_id', '=', self.campaign.id),
+            ('email', '=', 'budget@example.org'),
+        ])
+        self.assertEqual(len(application), 1)
+        self.assertEqual(application.state, 'submitted')
+        self.assertTrue(application.submission_date)
+        self.assertEqual(application.activity_domains, self.domain)
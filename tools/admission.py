@@ -0,0 +1,177 @@
+# tools/admission.py
+# -*- coding: utf-8 -*-
+from odoo.tools import config
+import hashlib
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_logger = logging.getLogger(__name__)
+
+# Portées du contrôle d'admission : préfixe des paramètres ``ong.rate_limit.*``
+# et débits par défaut (par minute, rafale) des seaux par IP et global
+ADMISSION_SCOPES = {
+    'submission': ('', {'ip': (5, 3), 'global': (120, 20)}),
+    'autosave': ('autosave_', {'ip': (60, 20), 'global': (1200, 200)}),
+}
+
+
+class TokenBucketStore:
+    """Seaux à jetons partagés entre workers via des fichiers verrouillés
+
+    Chaque seau est un petit fichier du data_dir contenant le nombre de jetons
+    restants et l'horodatage du dernier passage ; un verrou exclusif fcntl
+    sérialise les accès concurrents des différents processus.
+    """
+
+    def __init__(self, dbname):
+        self.directory = os.path.join(config['data_dir'], 'recrutement_ongs', 'rate_limit', dbname)
+
+    @classmethod
+    def is_available(cls):
+        """Le verrouillage fcntl n'existe pas sur toutes les plateformes"""
+        return fcntl is not None
+
+    def _bucket_path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def take(self, buckets):
+        """Consommer un jeton de chacun des seaux ``buckets``, ou d'aucun
+
+        ``buckets`` est une liste ``(clé, jetons regagnés par seconde, rafale
+        maximale)``, verrouillés dans cet ordre par tous les appelants. Un jeton
+        n'est consommé que si tous les seaux en ont un. Retourne ``(admis,
+        secondes avant un nouveau jeton)``.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        states = []
+        try:
+            for key, rate, capacity in buckets:
+                fd = os.open(self._bucket_path(key), os.O_RDWR | os.O_CREAT, 0o600)
+                states.append([fd, rate, 0.0])
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                content = os.read(fd, 64).decode()
+                try:
+                    tokens, last = (float(value) for value in content.split())
+                except ValueError:
+                    tokens, last = float(capacity), now
+                states[-1][2] = min(float(capacity), tokens + max(now - last, 0) * rate)
+
+            admitted = all(tokens >= 1 for _fd, _rate, tokens in states)
+            retry_after = max(((1 - tokens) / rate for _fd, rate, tokens in states if tokens < 1), default=0)
+
+            for fd, _rate, tokens in states:
+                if admitted:
+                    tokens -= 1
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, f"{tokens} {now}".encode())
+            return admitted, retry_after
+        finally:
+            for fd, _rate, _tokens in states:
+                os.close(fd)
+
+    def prune(self, max_idle):
+        """Supprimer les seaux inutilisés depuis ``max_idle`` secondes
+
+        Passé ce délai un seau est de nouveau plein : le supprimer ne change
+        rien au contrôle. Les seaux verrouillés par une requête sont conservés.
+        Retourne le nombre de seaux supprimés.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        limit = time.time() - max_idle
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file() or entry.stat().st_mtime >= limit:
+                    continue
+                fd = os.open(entry.path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if os.fstat(fd).st_mtime < limit:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+            finally:
+                os.close(fd)
+        return removed
+
+
+def _get_bucket_settings(env, scope):
+    """Seaux d'une portée : ``[(nom, jetons par seconde, rafale)]``
+
+    Lève ValueError ou TypeError si un paramètre est invalide ou si un débit
+    n'est pas strictement positif.
+    """
+    get_param = env['ir.config_parameter'].sudo().get_param
+    prefix, defaults = ADMISSION_SCOPES[scope]
+    settings = []
+    for name, (per_minute, burst) in defaults.items():
+        rate = float(get_param(f'ong.rate_limit.{prefix}{name}_per_minute', per_minute)) / 60
+        capacity = float(get_param(f'ong.rate_limit.{prefix}{name}_burst', burst))
+        if rate <= 0:
+            raise ValueError(f"ong.rate_limit.{prefix}{name}_per_minute doit être strictement positif")
+        settings.append((name, rate, max(capacity, 1)))
+    return settings
+
+
+def check_admission(env, remote_addr, scope='submission'):
+    """Contrôle d'admission d'une requête publique (seau par IP et seau global)
+
+    Les paramètres ``ong.rate_limit.*`` expriment les débits en requêtes par
+    minute, pour chaque portée de ``ADMISSION_SCOPES``. Retourne le délai
+    d'attente conseillé en secondes, ou 0 si admis.
+    """
+    get_param = env['ir.config_parameter'].sudo().get_param
+    if get_param('ong.rate_limit.enabled', 'True') in ('False', 'false', '0', ''):
+        return 0
+    if not TokenBucketStore.is_available():
+        return 0
+
+    try:
+        buckets = [
+            (f"{scope}:ip:{remote_addr}" if name == 'ip' else f"{scope}:{name}", rate, capacity)
+            for name, rate, capacity in _get_bucket_settings(env, scope)
+        ]
+    except (ValueError, TypeError) as e:
+        _logger.warning(f"Paramètres ong.rate_limit.* invalides, contrôle d'admission désactivé: {str(e)}")
+        return 0
+
+    try:
+        admitted, retry_after = TokenBucketStore(env.cr.dbname).take(buckets)
+        if not admitted:
+            return max(int(retry_after) + 1, 1)
+    except OSError as e:
+        # Le contrôle d'admission ne doit jamais bloquer une soumission
+        _logger.error(f"Contrôle d'admission indisponible: {str(e)}")
+    return 0
+
+
+def prune_admission_buckets(env):
+    """Supprimer les seaux revenus pleins (une IP inactive ne laisse pas de fichier)"""
+    if not TokenBucketStore.is_available():
+        return 0
+    try:
+        max_idle = max(
+            capacity / rate
+            for scope in ADMISSION_SCOPES
+            for _name, rate, capacity in _get_bucket_settings(env, scope)
+        )
+    except (ValueError, TypeError):
+        # Paramètres invalides : contrôle désactivé, les seaux restants datent d'avant
+        max_idle = 24 * 60 * 60
+    try:
+        return TokenBucketStore(env.cr.dbname).prune(max_idle)
+    except OSError as e:
+        _logger.error(f"Nettoyage des seaux d'admission impossible: {str(e)}")
+        return 0
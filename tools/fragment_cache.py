@@ -0,0 +1,45 @@
+# tools/fragment_cache.py
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+import threading
+
+
+class FragmentCache:
+    """Cache LRU en mémoire des fragments HTML rendus, propre à chaque worker
+
+    Les clés incluent la version des données affichées (date de modification,
+    compteurs...) : une modification produit une nouvelle clé dans tous les
+    workers, et les anciennes entrées sont évincées par la borne LRU.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """Fragment en cache pour ``key``, ou rendu par ``render()`` puis mis en cache"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        fragment = render()
+
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def invalidate(self, dbname, record_ids):
+        """Retirer les fragments des enregistrements donnés (clés ``(dbname, type, id, ...)``)"""
+        record_ids = set(record_ids)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dbname and key[2] in record_ids]:
+                del self._entries[key]
+
+
+# Fragments des pages publiques des campagnes (cartes de la liste, corps du détail)
+campaign_fragments = FragmentCache(max_size=1024)
@@ -1 +1,2 @@
-from . import ong_export_wizard
\ No newline at end of file
+from . import ong_export_wizard
+from . import ong_application_import_wizard
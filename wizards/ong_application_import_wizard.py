@@ -0,0 +1,95 @@
+# wizards/ong_application_import_wizard.py
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+import base64
+import csv
+import io
+import logging
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+class OngApplicationImportWizard(models.TransientModel):
+    _name = 'ong.application.import.wizard'
+    _description = 'Assistant d\'Import de Candidatures'
+
+    campaign_id = fields.Many2one('ong.recruitment.campaign', string='Campagne', required=True,
+                                  domain=[('state', '=', 'open')])
+    import_file = fields.Binary('Fichier (CSV ou XLSX)', required=True)
+    import_filename = fields.Char('Nom du Fichier')
+    skip_notifications = fields.Boolean('Ne pas notifier les candidats', default=False,
+                                        help="N'envoie ni email ni message de soumission pour les candidatures importées")
+    state = fields.Selection([
+        ('draft', 'À importer'),
+        ('done', 'Importé'),
+    ], default='draft')
+    created_count = fields.Integer('Candidatures Créées', readonly=True)
+    error_count = fields.Integer('Lignes en Erreur', readonly=True)
+    report = fields.Text('Rapport d\'Import', readonly=True)
+
+    def action_import(self):
+        """Importer le fichier et afficher le rapport ligne par ligne"""
+        self.ensure_one()
+        if not self.import_file:
+            raise ValidationError("Veuillez sélectionner un fichier à importer")
+
+        content = base64.b64decode(self.import_file)
+        filename = (self.import_filename or '').lower()
+        if filename.endswith('.xlsx'):
+            rows = self._iter_xlsx_rows(content)
+        elif filename.endswith('.csv'):
+            rows = self._iter_csv_rows(content)
+        else:
+            raise ValidationError("Format de fichier non supporté : utilisez un fichier .csv ou .xlsx")
+
+        report = self.env['ong.application']._import_rows(self.campaign_id, rows, notify=not self.skip_notifications)
+        errors = [line for line in report if line['status'] == 'error']
+        lines = [f"Ligne {line['row']} : {line['message']}" for line in errors]
+
+        self.write({
+            'state': 'done',
+            'created_count': len(report) - len(errors),
+            'error_count': len(errors),
+            'report': '\n'.join(lines) or "Toutes les lignes ont été importées.",
+            'import_file': False,
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.model
+    def _iter_csv_rows(self, content):
+        """Lecture ligne à ligne d'un CSV (séparateur détecté, en-têtes = champs du formulaire)"""
+        stream = io.TextIOWrapper(io.BytesIO(content), encoding='utf-8-sig', newline='')
+        sample = stream.read(4096)
+        stream.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.DictReader(stream, dialect=dialect):
+            yield {(key or '').strip(): value for key, value in row.items()}
+
+    @api.model
+    def _iter_xlsx_rows(self, content):
+        """Lecture ligne à ligne de la première feuille d'un classeur XLSX"""
+        if openpyxl is None:
+            raise ValidationError("La bibliothèque openpyxl est requise pour importer des fichiers Excel")
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            headers = [str(header or '').strip() for header in next(rows, ())]
+            for values in rows:
+                if any(value not in (None, '') for value in values):
+                    yield dict(zip(headers, values))
+        finally:
+            workbook.close()
@@ -398,9 +398,9 @@ class OngExportWizard(models.TransientModel):
             # Documents si demandés
             if self.include_documents:
                 docs = [
-                    'Oui' if app.statute_document else 'Non',
-                    'Oui' if app.certificate_document else 'Non',
-                    'Oui' if app.financial_report else 'Non'
+                    'Oui' if app.statute_document_size else 'Non',
+                    'Oui' if app.certificate_document_size else 'Non',
+                    'Oui' if app.financial_report_size else 'Non'
                 ]
                 for doc in docs:
                     worksheet.write(row, col, doc, cell_format)
@@ -542,22 +542,15 @@ class OngExportWizard(models.TransientModel):
         return domain
 
     def _get_application_scores(self, application):
-        """Récupérer tous les scores d'une candidature"""
-        scores = {
+        """Récupérer tous les scores d'une candidature depuis les colonnes dénormalisées"""
+        return {
             'total': application.total_score,
-            'experience': 0,
-            'budget': 0,
-            'staff': 0,
-            'documents': 0,
-            'completeness': 0
+            'experience': application.score_experience,
+            'budget': application.score_budget,
+            'staff': application.score_staff,
+            'documents': application.score_documents,
+            'completeness': application.score_completeness,
         }
-        
-        for evaluation in application.evaluation_ids:
-            criterion_code = evaluation.criterion_id.code
-            if criterion_code in scores:
-                scores[criterion_code] = evaluation.score
-        
-        return scores
 
     def _add_summary_sheet(self, workbook, applications):
         """Ajouter une feuille de résumé"""